@@ -0,0 +1,114 @@
+import json
+import time
+import sqlite3
+import hashlib
+from typing import Dict, Any, Optional
+
+class AnalysisCache:
+    """On-disk SQLite cache of LLM lead analyses.
+
+    Entries are keyed by a hash of the analyzed content together with the
+    model name and prompt version, so changing either invalidates old
+    results. Expired entries (TTL) are treated as misses, and the least
+    recently used entries are evicted once max_entries is exceeded.
+    """
+
+    def __init__(self, path: str, model: str, prompt_version: str,
+                 ttl_seconds: Optional[float] = 30 * 24 * 3600, max_entries: int = 100000):
+        self.path = path
+        self.model = model
+        self.prompt_version = prompt_version
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._puts_since_evict = 0
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                content_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                analysis TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (content_hash, model, prompt_version)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_last_used ON analyses (last_used)")
+        self.conn.commit()
+        self.purge_expired()
+
+    @staticmethod
+    def content_hash(*parts: str) -> str:
+        """Stable hash of the text that is sent to the model"""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode('utf-8', errors='replace'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _key(self, content_hash: str):
+        return (content_hash, self.model, self.prompt_version)
+
+    def get(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Return the cached analysis for content_hash, or None on a miss"""
+        row = self.conn.execute(
+            "SELECT analysis, created_at FROM analyses "
+            "WHERE content_hash = ? AND model = ? AND prompt_version = ?",
+            self._key(content_hash)
+        ).fetchone()
+
+        now = time.time()
+        if row is None or (self.ttl_seconds is not None and now - row[1] > self.ttl_seconds):
+            self.misses += 1
+            return None
+
+        self.conn.execute(
+            "UPDATE analyses SET last_used = ? "
+            "WHERE content_hash = ? AND model = ? AND prompt_version = ?",
+            (now,) + self._key(content_hash)
+        )
+        self.conn.commit()
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, content_hash: str, analysis: Dict[str, Any]):
+        """Store an analysis, periodically evicting least recently used entries"""
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO analyses "
+            "(content_hash, model, prompt_version, analysis, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            self._key(content_hash) + (json.dumps(analysis, ensure_ascii=False), now, now)
+        )
+        self.conn.commit()
+
+        # Eviction scans the table, so only run it every so often
+        self._puts_since_evict += 1
+        if self._puts_since_evict >= 256:
+            self.evict()
+
+    def evict(self):
+        """Drop the least recently used entries beyond max_entries"""
+        self.conn.execute(
+            "DELETE FROM analyses WHERE rowid IN ("
+            "SELECT rowid FROM analyses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        self.conn.commit()
+        self._puts_since_evict = 0
+
+    def purge_expired(self):
+        """Delete entries older than the TTL"""
+        if self.ttl_seconds is None:
+            return
+        self.conn.execute("DELETE FROM analyses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        self.conn.commit()
+
+    def close(self):
+        self.evict()
+        self.conn.close()
@@ -1,80 +1,317 @@
+import os
 import json
-import re
+import argparse
 import asyncio
 import aiohttp
+from collections import deque
 from elasticsearch import Elasticsearch
-import pandas as pd
 from datetime import datetime
-from typing import List, Dict, Any
+from analysis_cache import AnalysisCache
+from contact_extraction import extract_contact_info
+from keyword_scorer import KeywordScorer
+from result_writers import LeadResultWriter, ReportStats
+from checkpoint import Checkpoint
+from near_duplicates import NearDuplicateIndex
+from domain_index import DomainIndex
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterable, AsyncIterator
+
+# Model used by Open Manus for /analyze-lead and the version of its prompt.
+# Bump PROMPT_VERSION whenever the analysis prompt changes to invalidate
+# cached analyses.
+ANALYSIS_MODEL = "qwen:7b"
+PROMPT_VERSION = "2"
+
+# Content sent to Open Manus per page. Its chunk budget is MAX_CHUNKS x
+# CHUNK_TOKENS = 12 x 768 approximate tokens; pages average ~4.2 characters
+# per token, so 32k characters fit with headroom for chunk packing.
+# Anything past this is not analyzed.
+MAX_CONTENT_CHARS = 32000
+
+# Keyword groups for the fallback analysis
+KEYWORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "keywords.json")
+
+# HTTP statuses worth retrying against Open Manus (restarts, overload)
+RETRYABLE_STATUSES = {502, 503, 504}
+
+# HTTP status Open Manus answers when a page's model output is unusable;
+# final for that page, so it is not retried
+UNUSABLE_STATUS = 422
+
+# Consecutive keyword fallbacks after which Open Manus is considered down
+# and the run is aborted, so --resume can pick up the remaining pages
+MAX_CONSECUTIVE_FALLBACKS = 25
+
+class UnusableAnalysisError(Exception):
+    """Open Manus is up but could not turn the page into an analysis"""
 
 class EnhancedLeadAnalyzer:
-    def __init__(self):
+    def __init__(self, max_concurrency: int = 8, request_timeout: float = 180.0,
+                 max_retries: int = 2, retry_backoff: float = 1.0, page_size: int = 100,
+                 cache_path: Optional[str] = "/results/analysis_cache.db",
+                 keywords_path: str = KEYWORDS_PATH, results_dir: str = "/results",
+                 resume: bool = False, max_consecutive_fallbacks: int = MAX_CONSECUTIVE_FALLBACKS):
         self.es = Elasticsearch(['http://elasticsearch:9200'])
         self.open_manus_url = "http://open-manus:8000"
         self.ollama_url = "http://ollama:11434"
         
-    async def analyze_with_ai(self, content: str, url: str, title: str) -> Dict[str, Any]:
-        """Analyze content using Open Manus AI"""
-        async with aiohttp.ClientSession() as session:
-            payload = {
-                "content": content[:5000],  # Limit content size
-                "url": url,
-                "title": title
-            }
+        # Analysis stage limits: number of leads in flight against Open Manus
+        # and the per-request timeout before falling back to keyword analysis
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        
+        # Retry policy for transient Open Manus failures
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        
+        # Number of Elasticsearch hits fetched per search_after page
+        self.page_size = page_size
+        
+        # Persistent cache of AI analyses keyed by content hash
+        self.cache = AnalysisCache(cache_path, ANALYSIS_MODEL, PROMPT_VERSION) if cache_path else None
+        
+        # Output directory for CSV, JSON and summary reports
+        self.results_dir = results_dir
+        
+        # Continue from the checkpoint of an interrupted run instead of hit zero
+        self.resume = resume
+        self.max_consecutive_fallbacks = max_consecutive_fallbacks
+        
+        # Keyword groups used by the fallback analysis
+        self.keyword_scorer = KeywordScorer.from_file(keywords_path)
+        
+        # Shared HTTP session, created lazily inside the running event loop
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    def get_session(self) -> aiohttp.ClientSession:
+        """Return the shared keep-alive HTTP session for this analyzer"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.max_concurrency,
+                keepalive_timeout=60,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+            )
+        return self._session
+    
+    async def close(self):
+        """Close the shared HTTP session and the analysis cache"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+    
+    async def post_json(self, path: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """POST to Open Manus, retrying transient failures with exponential backoff.
+        
+        Returns the decoded JSON body, or None for a non-retryable error status.
+        Raises UnusableAnalysisError for UNUSABLE_STATUS, and the last error
+        once retries are exhausted.
+        """
+        session = self.get_session()
+        
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                async with session.post(f"{self.open_manus_url}{path}", json=payload) as response:
+                    if response.status == 200:
+                        return await response.json()
+                    if response.status == UNUSABLE_STATUS:
+                        body = await response.json(content_type=None)
+                        raise UnusableAnalysisError(body.get('detail', 'analysis unusable'))
+                    if response.status not in RETRYABLE_STATUSES:
+                        return None
+                    if last_attempt:
+                        response.raise_for_status()
+            except aiohttp.ClientConnectionError:
+                if last_attempt:
+                    raise
             
-            async with session.post(
-                f"{self.open_manus_url}/analyze-lead",
-                json=payload
-            ) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    return await self.fallback_analysis(content, url)
+            await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+        
+        return None
     
-    async def fallback_analysis(self, content: str, url: str) -> Dict[str, Any]:
-        """Fallback analysis if AI service is unavailable"""
-        content_lower = content.lower()
+    async def analyze_with_ai(self, content: str, url: str, title: str) -> Dict[str, Any]:
+        """Analyze content using Open Manus AI"""
+        payload = {
+            "content": content[:MAX_CONTENT_CHARS],
+            "url": url,
+            "title": title
+        }
+        
+        # Unchanged pages from a re-crawl reuse their stored analysis
+        content_hash = AnalysisCache.content_hash(title, payload["content"])
+        if self.cache is not None:
+            cached = self.cache.get(content_hash)
+            if cached is not None:
+                return cached
         
-        # Basic keyword analysis
-        ai_keywords = ['ai', 'artificial intelligence', 'machine learning', 'neural network']
-        perf_keywords = ['performance testing', 'load testing', 'stress testing', 'jmeter', 'gatling']
+        try:
+            result = await self.post_json("/analyze-lead", payload)
+        except UnusableAnalysisError as e:
+            print(f"⚠️ AI analysis unusable for {url} ({e}), using keyword analysis")
+            return await self.fallback_analysis(content, url, final=True)
+        if result is not None:
+            if self.cache is not None:
+                self.cache.put(content_hash, result)
+            return result
+        return await self.fallback_analysis(content, url)
+    
+    async def fallback_analysis(self, content: str, url: str, final: bool = False) -> Dict[str, Any]:
+        """Fallback analysis if AI service is unavailable.
         
-        ai_score = sum(1 for keyword in ai_keywords if keyword in content_lower)
-        perf_score = sum(1 for keyword in perf_keywords if keyword in content_lower)
+        final marks pages the AI service answered but could not analyze,
+        whose keyword analysis is kept rather than retried on --resume.
+        """
+        # Basic keyword analysis: one scan counts every configured keyword
+        scores = self.keyword_scorer.score(content)
+        ai_score = len(scores.get('ai', {}))
+        perf_score = len(scores.get('performance', {}))
         
         return {
             "relevance_score": min(10, (ai_score + perf_score) * 2),
             "intent_classification": "unknown",
             "potential_value": "medium" if (ai_score + perf_score) > 2 else "low",
-            "key_insights": ["Basic analysis - AI service unavailable"],
+            "key_insights": ["Basic analysis - AI analysis unusable" if final
+                             else "Basic analysis - AI service unavailable"],
             "competitor_mentions": [],
-            "technology_stack": []
+            "technology_stack": [],
+            "keyword_counts": scores,
+            "fallback": True,
+            "final": final
         }
     
     def extract_advanced_contact_info(self, content: str, url: str) -> Dict[str, Any]:
         """Enhanced contact information extraction"""
-        # Email patterns
-        emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', content)
+        return extract_contact_info(content, url)
+    
+    async def analyze_hit(self, hit: Dict[str, Any],
+                          semaphore: asyncio.Semaphore) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Analyze a single Elasticsearch hit.
         
-        # Phone patterns (international)
-        phones = re.findall(r'(\+?\d{1,3}[-.\s]?)?\(?\d{2,3}\)?[-.\s]?\d{2,4}[-.\s]?\d{3,4}', content)
+        Returns the lead (None if not relevant) and whether the keyword
+        fallback stood in because the AI service could not be reached.
+        """
+        source = hit['_source']
+        url = source.get('url', '')
+        title = source.get('title', '')
+        content = source.get('content', '')
         
-        # Social media handles
-        linkedin = re.findall(r'linkedin\.com/(?:in|company)/[^\s\)]+', content)
-        twitter = re.findall(r'twitter\.com/([^\s\)]+)', content)
+        # Extract contact info
+        contact_info = self.extract_advanced_contact_info(content, url)
         
-        # Company info from URL and content
-        company_match = re.search(r'https?://(?:www\.)?([^/]+)', url)
-        company = company_match.group(1) if company_match else None
+        # AI analysis, bounded by the in-flight limit and the session timeout
+        async with semaphore:
+            try:
+                ai_analysis = await self.analyze_with_ai(content, url, title)
+            except asyncio.TimeoutError:
+                print(f"⏱️ AI analysis timed out for {url}, using fallback")
+                ai_analysis = await self.fallback_analysis(content, url)
+            except aiohttp.ClientError as e:
+                print(f"Error analyzing {url}: {e}")
+                ai_analysis = await self.fallback_analysis(content, url)
         
-        return {
-            'emails': list(set(emails)),
-            'phones': list(set(phones)),
-            'linkedin_profiles': linkedin,
-            'twitter_handles': twitter,
-            'company': company,
-            'domain': company
+        used_fallback = bool(ai_analysis.get('fallback')) and not ai_analysis.get('final')
+        
+        # Only include leads with sufficient relevance
+        if ai_analysis.get('relevance_score', 0) < 5:
+            return None, used_fallback
+        
+        lead = {
+            'url': url,
+            'title': title,
+            'company': contact_info['company'],
+            'emails': contact_info['emails'],
+            'phones': contact_info['phones'],
+            'linkedin_profiles': contact_info['linkedin_profiles'],
+            'twitter_handles': contact_info['twitter_handles'],
+            'ai_analysis': ai_analysis,
+            'relevance_score': ai_analysis.get('relevance_score', 0),
+            'potential_value': ai_analysis.get('potential_value', 'low'),
+            'intent_classification': ai_analysis.get('intent_classification', 'unknown'),
+            'key_insights': ai_analysis.get('key_insights', []),
+            'technology_stack': ai_analysis.get('technology_stack', []),
+            'timestamp': datetime.now().isoformat()
         }
+        return lead, used_fallback
+    
+    async def stream_hits(self, query: Dict[str, Any], index: str = "nutch",
+                          keep_alive: str = "5m") -> AsyncIterator[Dict[str, Any]]:
+        """Stream every hit matching query, one search_after page at a time.
+        
+        Pages are read against a point-in-time so the result set stays
+        consistent while the crawler keeps indexing. Only one page is held in
+        memory, and the blocking client calls run in a worker thread.
+        """
+        pit = await asyncio.to_thread(self.es.open_point_in_time, index=index, keep_alive=keep_alive)
+        pit_id = pit['id']
+        search_after = None
+        
+        try:
+            while True:
+                params = {
+                    "query": query,
+                    "size": self.page_size,
+                    "pit": {"id": pit_id, "keep_alive": keep_alive},
+                    "sort": [{"_shard_doc": "asc"}]
+                }
+                if search_after is not None:
+                    params["search_after"] = search_after
+                
+                response = await asyncio.to_thread(self.es.search, **params)
+                # The PIT id may change between pages
+                pit_id = response.get('pit_id', pit_id)
+                hits = response['hits']['hits']
+                if not hits:
+                    break
+                
+                for hit in hits:
+                    yield hit
+                
+                if len(hits) < self.page_size:
+                    break
+                search_after = hits[-1]['sort']
+        finally:
+            try:
+                await asyncio.to_thread(self.es.close_point_in_time, id=pit_id)
+            except Exception as e:
+                print(f"Error closing point-in-time: {e}")
+    
+    async def _analyze_hit_pair(self, hit: Dict[str, Any], semaphore: asyncio.Semaphore
+                                ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], bool]:
+        lead, used_fallback = await self.analyze_hit(hit, semaphore)
+        return hit, lead, used_fallback
+    
+    async def analyze_hits(self, hits: AsyncIterable[Dict[str, Any]]
+                           ) -> AsyncIterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]], bool]]:
+        """Analyze hits concurrently, yielding (hit, lead, used_fallback) in the same order as the hits"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        # Bound the reorder buffer so a slow lead cannot pull in the whole index
+        window = self.max_concurrency * 4
+        pending = deque()
+        
+        try:
+            async for hit in hits:
+                if len(pending) >= window:
+                    yield await pending.popleft()
+                pending.append(asyncio.ensure_future(self._analyze_hit_pair(hit, semaphore)))
+            
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
     
     async def generate_leads_report(self):
         """Generate comprehensive AI-enhanced leads report"""
@@ -82,172 +319,187 @@ class EnhancedLeadAnalyzer:
         
         # Search Elasticsearch for relevant content
         query = {
-            "query": {
-                "bool": {
-                    "should": [
-                        {"match": {"content": "performance testing"}},
-                        {"match": {"content": "load testing"}},
-                        {"match": {"content": "AI"}},
-                        {"match": {"content": "artificial intelligence"}},
-                        {"match": {"content": "JMeter"}},
-                        {"match": {"content": "Gatling"}}
-                    ],
-                    "minimum_should_match": 1
-                }
-            },
-            "size": 100
+            "bool": {
+                "should": [
+                    {"match": {"content": "performance testing"}},
+                    {"match": {"content": "load testing"}},
+                    {"match": {"content": "AI"}},
+                    {"match": {"content": "artificial intelligence"}},
+                    {"match": {"content": "JMeter"}},
+                    {"match": {"content": "Gatling"}}
+                ],
+                "minimum_should_match": 1
+            }
         }
         
-        response = self.es.search(index="nutch", body=query)
-        results = response['hits']['hits']
-        
         leads = []
+        writer = LeadResultWriter(self.results_dir)
+        checkpoint = Checkpoint(os.path.join(self.results_dir, 'checkpoint.jsonl'), resume=self.resume)
+        near_duplicates = NearDuplicateIndex()
+        domains = DomainIndex()
         
-        # Process leads with AI analysis
-        for hit in results:
-            source = hit['_source']
-            url = source.get('url', '')
-            title = source.get('title', '')
-            content = source.get('content', '')
-            
-            # Extract contact info
-            contact_info = self.extract_advanced_contact_info(content, url)
-            
-            # AI analysis
-            ai_analysis = await self.analyze_with_ai(content, url, title)
-            
-            # Only include leads with sufficient relevance
-            if ai_analysis.get('relevance_score', 0) >= 5:
-                lead = {
-                    'url': url,
-                    'title': title,
-                    'company': contact_info['company'],
-                    'emails': contact_info['emails'],
-                    'phones': contact_info['phones'],
-                    'linkedin_profiles': contact_info['linkedin_profiles'],
-                    'twitter_handles': contact_info['twitter_handles'],
-                    'ai_analysis': ai_analysis,
-                    'relevance_score': ai_analysis.get('relevance_score', 0),
-                    'potential_value': ai_analysis.get('potential_value', 'low'),
-                    'intent_classification': ai_analysis.get('intent_classification', 'unknown'),
-                    'key_insights': ai_analysis.get('key_insights', []),
-                    'technology_stack': ai_analysis.get('technology_stack', []),
-                    'timestamp': datetime.now().isoformat()
-                }
-                leads.append(lead)
+        def accept(lead: Dict[str, Any]):
+            leads.append(lead)
+            writer.write_lead(lead)
+            domains.add(lead)
+        
+        # Leads finished by an interrupted run are restored, not re-analyzed
+        if checkpoint.completed:
+            print(f"♻️ Resuming: {len(checkpoint.completed)} documents already analyzed")
+        for lead in checkpoint.leads:
+            accept(lead)
+        
+        # Stream hits into AI analysis, writing each lead as soon as it is ready
+        # Near-duplicate pages are dropped before analysis; resumed runs
+        # still see every hit so clusters keep the same representative
+        hits = checkpoint.skip_completed(near_duplicates.filter(self.stream_hits(query)))
+        results = self.analyze_hits(hits)
+        consecutive_fallbacks = 0
+        try:
+            async for hit, lead, used_fallback in results:
+                # Keyword fallbacks for an unreachable AI service are not
+                # checkpointed, so --resume retries those pages; pages it
+                # answered as unusable are final and recorded
+                if used_fallback:
+                    consecutive_fallbacks += 1
+                    if consecutive_fallbacks >= self.max_consecutive_fallbacks:
+                        raise RuntimeError(
+                            f"{consecutive_fallbacks} consecutive AI analyses failed; "
+                            "Open Manus appears to be down. Re-run with --resume once it is back."
+                        )
+                else:
+                    consecutive_fallbacks = 0
+                    checkpoint.record(hit['_id'], lead)
+                if lead is not None:
+                    accept(lead)
+        except BaseException:
+            # Cancel analyses still in flight before giving up
+            await results.aclose()
+            writer.close()
+            raise
+        finally:
+            checkpoint.close()
+        
+        # Attach the URLs each representative page stands for
+        for lead in leads:
+            if lead['url'] in near_duplicates.duplicates:
+                lead['duplicate_urls'] = near_duplicates.duplicates[lead['url']]
+        if near_duplicates.dropped:
+            print(f"🧬 Skipped {near_duplicates.dropped} near-duplicate pages")
         
         # Sort by relevance score
         leads.sort(key=lambda x: x['relevance_score'], reverse=True)
         
-        # Generate personalized approaches for top leads
-        top_leads = leads[:10]  # Top 10 leads
-        await self.generate_personalized_approaches(top_leads)
+        # Generate personalized approaches once per company, using the
+        # contacts merged across all of its pages
+        top_companies = domains.top(10)  # Top 10 companies
+        await self.generate_personalized_approaches(top_companies)
+        
+        # The company's best page carries its approach in the lead outputs
+        approaches = {c['url']: c['personalized_approach'] for c in top_companies}
+        for lead in leads:
+            if lead['url'] in approaches:
+                lead['personalized_approach'] = approaches[lead['url']]
         
         # Save results
-        self.save_results(leads)
+        self.save_results(writer, leads, top_companies)
         
-        print(f"✅ Found {len(leads)} AI-analyzed leads")
-        print(f"🏆 High-quality leads (score >= 7): {len([l for l in leads if l['relevance_score'] >= 7])}")
+        print(f"✅ Found {len(leads)} AI-analyzed leads from {len(domains.companies)} companies")
+        if self.cache is not None:
+            print(f"💾 Analysis cache: {self.cache.hits} hits, {self.cache.misses} misses")
+        print(f"🏆 High-quality leads (score >= 7): {writer.stats.high_quality_leads}")
         
         return leads
     
     async def generate_personalized_approaches(self, leads: List[Dict]):
-        """Generate personalized outreach approaches for top leads"""
-        async with aiohttp.ClientSession() as session:
-            for lead in leads:
-                try:
-                    payload = {
-                        "leads": [{
-                            "url": lead['url'],
-                            "content": lead.get('content', ''),
-                            "title": lead['title'],
-                            "contact_info": {
-                                "emails": lead['emails'],
-                                "company": lead['company']
-                            }
-                        }]
-                    }
-                    
-                    async with session.post(
-                        f"{self.open_manus_url}/analyze-batch",
-                        json=payload
-                    ) as response:
-                        if response.status == 200:
-                            result = await response.json()
-                            if result.get('results'):
-                                lead['personalized_approach'] = result['results'][0].get('personalized_approach', '')
-                
-                except Exception as e:
-                    print(f"Error generating approach for {lead['url']}: {e}")
-                    lead['personalized_approach'] = "Approach generation failed."
-    
-    def save_results(self, leads: List[Dict]):
-        """Save leads to various formats"""
-        # CSV format
-        csv_data = []
-        for lead in leads:
-            csv_data.append({
-                'url': lead['url'],
-                'title': lead['title'],
-                'company': lead['company'],
-                'emails': '; '.join(lead['emails']),
-                'phones': '; '.join(lead['phones']),
-                'relevance_score': lead['relevance_score'],
-                'potential_value': lead['potential_value'],
-                'intent_classification': lead['intent_classification'],
-                'key_insights': ' | '.join(lead['key_insights']),
-                'technology_stack': ' | '.join(lead['technology_stack'])
-            })
-        
-        df = pd.DataFrame(csv_data)
-        df.to_csv('/results/ai_leads.csv', index=False)
-        
-        # Detailed JSON report
-        report = {
-            'generated_at': datetime.now().isoformat(),
-            'total_leads': len(leads),
-            'high_quality_leads': len([l for l in leads if l['relevance_score'] >= 7]),
-            'leads_by_intent': {},
-            'leads': leads
+        """Generate personalized outreach approaches for top leads or company records.
+        
+        All leads go to Open Manus in one streaming batch; each approach is
+        stored as soon as its result line arrives instead of after the batch.
+        """
+        if not leads:
+            return
+        
+        payload = {
+            "leads": [{
+                "url": lead['url'],
+                "title": lead['title'],
+                # Already analyzed here, so Open Manus goes straight to the approach
+                "analysis": lead['ai_analysis'],
+                "contact_info": {
+                    "emails": lead['emails'],
+                    "company": lead['company']
+                }
+            } for lead in leads]
         }
         
-        # Count leads by intent
+        # Generation can run for minutes overall; only bound the gap between lines
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=self.request_timeout)
+        
+        try:
+            async with self.get_session().post(
+                f"{self.open_manus_url}/analyze-batch/stream", json=payload, timeout=timeout
+            ) as response:
+                response.raise_for_status()
+                async for line in response.content:
+                    if not line.strip():
+                        continue
+                    event = json.loads(line)
+                    if event.get('type') != 'result':
+                        continue
+                    
+                    lead = leads[event['index']]
+                    if 'error' in event:
+                        print(f"Error generating approach for {lead['url']}: {event['error']}")
+                        lead['personalized_approach'] = "Approach generation failed."
+                    else:
+                        lead['personalized_approach'] = event.get('personalized_approach', '')
+                        print(f"💡 Approach ready for {lead['company']}")
+        
+        except Exception as e:
+            print(f"Error generating approaches: {e}")
+        
         for lead in leads:
-            intent = lead['intent_classification']
-            report['leads_by_intent'][intent] = report['leads_by_intent'].get(intent, 0) + 1
+            lead.setdefault('personalized_approach', "Approach generation failed.")
+    
+    def save_results(self, writer: LeadResultWriter, leads: List[Dict], companies: List[Dict]):
+        """Finish the streamed CSV/JSON outputs and write the company and summary reports"""
+        # Fields added after each lead was streamed to disk
+        updates = {}
+        for lead in leads:
+            fields = {key: lead[key] for key in ('personalized_approach', 'duplicate_urls') if lead.get(key)}
+            if fields:
+                updates[lead['url']] = fields
+        writer.close(updates)
         
-        with open('/results/ai_leads_detailed.json', 'w') as f:
-            json.dump(report, f, indent=2, ensure_ascii=False)
+        # Top companies with contacts merged across their pages
+        with open(os.path.join(self.results_dir, 'ai_companies.json'), 'w', encoding='utf-8') as f:
+            json.dump(companies, f, indent=2, ensure_ascii=False)
         
         # Generate summary report
-        self.generate_summary_report(leads)
+        self.generate_summary_report(writer.stats)
     
-    def generate_summary_report(self, leads: List[Dict]):
+    def generate_summary_report(self, stats: ReportStats):
         """Generate a human-readable summary report"""
         summary = f"""
 # AI-Powered Lead Generation Report
 Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 ## Executive Summary
-- Total Leads Found: {len(leads)}
-- High-Quality Leads (Score >= 7): {len([l for l in leads if l['relevance_score'] >= 7])}
-- Average Relevance Score: {sum(l['relevance_score'] for l in leads) / len(leads) if leads else 0:.2f}
+- Total Leads Found: {stats.total_leads}
+- High-Quality Leads (Score >= 7): {stats.high_quality_leads}
+- Average Relevance Score: {stats.average_score:.2f}
 
 ## Top Lead Categories
 """
         
         # Add intent breakdown
-        intent_counts = {}
-        for lead in leads:
-            intent = lead['intent_classification']
-            intent_counts[intent] = intent_counts.get(intent, 0) + 1
-        
-        for intent, count in sorted(intent_counts.items(), key=lambda x: x[1], reverse=True):
+        for intent, count in sorted(stats.leads_by_intent.items(), key=lambda x: x[1], reverse=True):
             summary += f"- {intent}: {count} leads\n"
         
         # Top 5 leads
         summary += "\n## Top 5 Leads\n"
-        for i, lead in enumerate(leads[:5], 1):
+        for i, lead in enumerate(stats.top_leads(5), 1):
             summary += f"""
 {i}. **{lead['company']}** (Score: {lead['relevance_score']}/10)
    - URL: {lead['url']}
@@ -257,12 +509,17 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
    - Emails: {', '.join(lead['emails'][:2])}
 """
         
-        with open('/results/summary_report.md', 'w') as f:
+        with open(os.path.join(self.results_dir, 'summary_report.md'), 'w') as f:
             f.write(summary)
 
 async def main():
-    analyzer = EnhancedLeadAnalyzer()
-    await analyzer.generate_leads_report()
+    parser = argparse.ArgumentParser(description="AI-enhanced lead analysis over the Nutch index")
+    parser.add_argument('--resume', action='store_true',
+                        help="skip documents recorded in the checkpoint of an interrupted run")
+    args = parser.parse_args()
+    
+    async with EnhancedLeadAnalyzer(resume=args.resume) as analyzer:
+        await analyzer.generate_leads_report()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
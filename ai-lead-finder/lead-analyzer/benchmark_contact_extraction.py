@@ -0,0 +1,74 @@
+"""Benchmark contact extraction on large synthetic crawled pages.
+
+Compares the original per-call re.findall implementation with the
+precompiled contact_extraction module, single-threaded and batched.
+
+    python benchmark_contact_extraction.py [pages] [page_kb]
+"""
+import re
+import sys
+import time
+import random
+from contact_extraction import extract_contact_info, extract_contact_info_batch
+
+FILLER = ("performance testing load testing JMeter Gatling AI artificial intelligence "
+          "machine learning email maintain release 2024 version 3.2.1 contact us pricing "
+          "latency p99 throughput 1500 requests per second").split()
+
+CONTACTS = [
+    "sales@example.com", "Jane.Doe@Company.co.uk", "+1 (555) 123-4567", "+44 20 7946 0958",
+    "555.987.6543", "https://www.linkedin.com/in/jane-doe", "linkedin.com/company/acme-corp",
+    "https://twitter.com/acme_qa", "https://x.com/perf_team",
+]
+
+def legacy_extract(content: str, url: str):
+    """The original extract_advanced_contact_info implementation"""
+    emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', content)
+    phones = re.findall(r'(\+?\d{1,3}[-.\s]?)?\(?\d{2,3}\)?[-.\s]?\d{2,4}[-.\s]?\d{3,4}', content)
+    linkedin = re.findall(r'linkedin\.com/(?:in|company)/[^\s\)]+', content)
+    twitter = re.findall(r'twitter\.com/([^\s\)]+)', content)
+    company_match = re.search(r'https?://(?:www\.)?([^/]+)', url)
+    company = company_match.group(1) if company_match else None
+    return {
+        'emails': list(set(emails)),
+        'phones': list(set(phones)),
+        'linkedin_profiles': linkedin,
+        'twitter_handles': twitter,
+        'company': company,
+        'domain': company
+    }
+
+def make_page(size_kb: int, rng: random.Random) -> str:
+    words = []
+    length = 0
+    while length < size_kb * 1024:
+        word = rng.choice(CONTACTS) if rng.random() < 0.002 else rng.choice(FILLER)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)
+
+def timed(label: str, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed * 1000:10.1f} ms")
+    return result
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    page_kb = int(sys.argv[2]) if len(sys.argv) > 2 else 512
+
+    rng = random.Random(42)
+    documents = [(make_page(page_kb, rng), f"https://www.site{i}.com/page") for i in range(pages)]
+    print(f"📄 {pages} pages x {page_kb} KB")
+
+    timed("legacy re.findall", lambda: [legacy_extract(c, u) for c, u in documents])
+    results = timed("precompiled", lambda: [extract_contact_info(c, u) for c, u in documents])
+    timed("batch (4 processes)", extract_contact_info_batch, documents, 4)
+
+    sample = results[0]
+    print(f"\nSample: {len(sample['emails'])} emails, {len(sample['phones'])} phones, "
+          f"{len(sample['linkedin_profiles'])} LinkedIn, {len(sample['twitter_handles'])} Twitter")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import os
+import json
+from typing import List, Dict, Any, Optional, Set, AsyncIterable, AsyncIterator
+
+class Checkpoint:
+    """Append-only JSONL record of Elasticsearch documents already analyzed.
+
+    Each line holds a document ID and the resulting lead (null when the page
+    was not relevant). Lines are flushed as they are recorded, so after a
+    crash a resumed run skips every document that finished, and restores
+    its lead without calling the AI service again.
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.completed: Set[str] = set()
+        self.leads: List[Dict[str, Any]] = []
+
+        if resume and os.path.exists(path):
+            self._load()
+        self._file = open(path, 'a' if resume else 'w', encoding='utf-8')
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave the last line half written
+                    continue
+                if record['id'] in self.completed:
+                    continue
+                self.completed.add(record['id'])
+                if record.get('lead') is not None:
+                    self.leads.append(record['lead'])
+
+    async def skip_completed(self, hits: AsyncIterable[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Filter out hits whose documents were analyzed in a previous run"""
+        async for hit in hits:
+            if hit['_id'] not in self.completed:
+                yield hit
+
+    def record(self, doc_id: str, lead: Optional[Dict[str, Any]]):
+        """Mark a document as analyzed"""
+        self.completed.add(doc_id)
+        self._file.write(json.dumps({'id': doc_id, 'lead': lead}, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
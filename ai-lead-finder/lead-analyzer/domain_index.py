@@ -0,0 +1,76 @@
+import tldextract
+from typing import List, Dict, Any, Optional
+
+# Public suffix lookup against the snapshot bundled with tldextract; no
+# network fetch of the live list
+SUFFIX_EXTRACT = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None)
+
+LIST_FIELDS = ['emails', 'phones', 'linkedin_profiles', 'twitter_handles', 'technology_stack']
+
+def registered_domain(host: Optional[str]) -> Optional[str]:
+    """Collapse a host name to its registered domain (blog.acme.co.uk -> acme.co.uk).
+
+    IP addresses and hosts without a known public suffix are returned
+    unchanged rather than guessed at, so unrelated companies never share a
+    key.
+    """
+    if not host:
+        return None
+    host = host.lower().strip('.')
+    parts = SUFFIX_EXTRACT(host)
+    if not parts.suffix or not parts.domain:
+        return host
+    return f"{parts.domain}.{parts.suffix}"
+
+class DomainIndex:
+    """In-memory index merging page-level leads into one record per company domain.
+
+    Contacts, social profiles and technology stack are unioned across all
+    pages of a domain, and the best-scoring page supplies the analysis used
+    for outreach.
+    """
+
+    def __init__(self):
+        self.companies: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, lead: Dict[str, Any]):
+        domain = registered_domain(lead.get('company')) or lead['url']
+        record = self.companies.get(domain)
+
+        if record is None:
+            record = {
+                'company': domain,
+                'pages': [],
+                'page_count': 0,
+                **{field: {} for field in LIST_FIELDS}
+            }
+            self.companies[domain] = record
+
+        record['pages'].append(lead['url'])
+        record['page_count'] += 1
+        for field in LIST_FIELDS:
+            for value in lead.get(field, []):
+                record[field].setdefault(value, None)
+
+        # The best page provides the analysis and the representative URL
+        if record.get('relevance_score') is None or lead['relevance_score'] > record['relevance_score']:
+            record.update({
+                'url': lead['url'],
+                'title': lead['title'],
+                'relevance_score': lead['relevance_score'],
+                'potential_value': lead['potential_value'],
+                'intent_classification': lead['intent_classification'],
+                'ai_analysis': lead['ai_analysis']
+            })
+
+    def merged(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Company record with list fields materialized"""
+        return {**record, **{field: list(record[field]) for field in LIST_FIELDS}}
+
+    def top(self, n: int) -> List[Dict[str, Any]]:
+        """The n companies with the best page score, highest first"""
+        ranked = sorted(self.companies.values(), key=lambda r: r['relevance_score'], reverse=True)
+        return [self.merged(record) for record in ranked[:n]]
+
+    def records(self) -> List[Dict[str, Any]]:
+        return [self.merged(record) for record in self.companies.values()]
@@ -0,0 +1,69 @@
+import re
+import json
+from typing import Dict, List
+
+class KeywordScorer:
+    """Count keyword occurrences for several keyword groups in a single pass.
+
+    All keywords are merged into a trie and compiled into one regular
+    expression, so the regex engine walks the text once and follows shared
+    prefixes like an Aho-Corasick automaton, running in C rather than a
+    per-character Python loop. Matches must sit on word boundaries, so 'ai'
+    is not found inside 'email' or 'maintain'. Matching is case-insensitive.
+    """
+
+    def __init__(self, groups: Dict[str, List[str]]):
+        self.groups = {group: [' '.join(k.lower().split()) for k in keywords]
+                       for group, keywords in groups.items()}
+
+        # Keyword -> groups it belongs to
+        self.keyword_groups: Dict[str, List[str]] = {}
+        for group, keywords in self.groups.items():
+            for keyword in keywords:
+                self.keyword_groups.setdefault(keyword, []).append(group)
+
+        self.pattern = re.compile(r'\b(' + self._trie_pattern(list(self.keyword_groups)) + r')\b')
+
+    @classmethod
+    def from_file(cls, path: str) -> 'KeywordScorer':
+        """Load keyword groups from a JSON file mapping group name to keyword list"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _trie_pattern(keywords: List[str]) -> str:
+        """Regex source for keywords, factored by common prefixes"""
+        trie = {}
+        for keyword in keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = {}
+
+        def build(node: Dict) -> str:
+            # Spaces inside phrases match any run of whitespace, including line breaks
+            branches = [(r'\s+' if char == ' ' else re.escape(char)) + build(child)
+                        for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ''
+            body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+            # A keyword ending here makes the rest of the branch optional
+            return f'(?:{body})?' if '' in node else body
+
+        return build(trie) or '(?!)'
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Occurrences of each keyword in text (keywords that do not occur are omitted)"""
+        counts: Dict[str, int] = {}
+        for match in self.pattern.findall(text.lower()):
+            keyword = ' '.join(match.split())
+            counts[keyword] = counts.get(keyword, 0) + 1
+        return counts
+
+    def score(self, text: str) -> Dict[str, Dict[str, int]]:
+        """Per-group keyword counts for text"""
+        scores: Dict[str, Dict[str, int]] = {group: {} for group in self.groups}
+        for keyword, occurrences in self.count(text).items():
+            for group in self.keyword_groups[keyword]:
+                scores[group][keyword] = occurrences
+        return scores
@@ -0,0 +1,105 @@
+import re
+import hashlib
+import numpy as np
+from contact_extraction import company_from_url
+from domain_index import registered_domain
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterable, AsyncIterator
+
+WORD_PATTERN = re.compile(r'\w+')
+
+def simhash(text: str, shingle_size: int = 3) -> Optional[int]:
+    """64-bit SimHash over word shingles of text, or None if text is too short.
+
+    Each distinct shingle votes on every bit of the fingerprint, so pages
+    that differ only in small parts (navigation, dates, pagination links)
+    end up within a few bits of each other. Shingles are hashed with
+    8-byte BLAKE2b rather than the built-in hash(), which is randomized per
+    process: fingerprints must be stable across runs so a resumed run
+    clusters pages exactly as the interrupted one did.
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < shingle_size:
+        return None
+
+    shingles = {' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'little') for s in shingles),
+        dtype=np.uint64, count=len(shingles)
+    )
+
+    # Count set bits per position across all shingle hashes in one vectorized pass
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+
+    fingerprint = 0
+    for position in np.flatnonzero(votes > 0):
+        fingerprint |= 1 << int(position)
+    return fingerprint
+
+class NearDuplicateIndex:
+    """Streaming near-duplicate filter for Elasticsearch hits.
+
+    The first hit of each cluster becomes its representative; later hits
+    whose SimHash is within max_distance bits are dropped and their URLs
+    recorded against the representative. Fingerprints are split into bands
+    (LSH): two fingerprints within max_distance bits must agree exactly on
+    at least one of max_distance + 1 bands, so only hits sharing a band
+    bucket are compared. Buckets are per registered domain: only pages of
+    the same site are clustered, so a look-alike page of another company
+    still reaches analysis and the domain index:
+
+    >>> index = NearDuplicateIndex()
+    >>> page = 'Load testing and performance engineering services for web platforms. ' * 20
+    >>> index.is_duplicate('https://acme.co.kr/a', page), index.is_duplicate('https://beta.co.kr/a', page)
+    (False, False)
+    >>> index.is_duplicate('https://www.acme.co.kr/b', page)
+    True
+    """
+
+    def __init__(self, max_distance: int = 6):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = 64 // self.bands
+        self._buckets: Dict[Tuple[str, int, int], List[Tuple[int, str]]] = {}
+        # Representative URL -> URLs of the near-duplicates it stands for
+        self.duplicates: Dict[str, List[str]] = {}
+        self.dropped = 0
+
+    def _band_keys(self, site: str, fingerprint: int) -> List[Tuple[str, int, int]]:
+        mask = (1 << self.band_bits) - 1
+        return [(site, band, (fingerprint >> (band * self.band_bits)) & mask) for band in range(self.bands)]
+
+    def find(self, site: str, fingerprint: int) -> Optional[str]:
+        """URL of the representative on site near fingerprint, if any"""
+        for key in self._band_keys(site, fingerprint):
+            for candidate, url in self._buckets.get(key, ()):
+                if bin(candidate ^ fingerprint).count('1') <= self.max_distance:
+                    return url
+        return None
+
+    def add(self, site: str, fingerprint: int, url: str):
+        for key in self._band_keys(site, fingerprint):
+            self._buckets.setdefault(key, []).append((fingerprint, url))
+
+    def is_duplicate(self, url: str, content: str) -> bool:
+        """Record content and return True if it duplicates an earlier page"""
+        fingerprint = simhash(content)
+        if fingerprint is None:
+            return False
+
+        site = registered_domain(company_from_url(url)) or ''
+        representative = self.find(site, fingerprint)
+        if representative is None or representative == url:
+            self.add(site, fingerprint, url)
+            return False
+
+        self.duplicates.setdefault(representative, []).append(url)
+        self.dropped += 1
+        return True
+
+    async def filter(self, hits: AsyncIterable[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield only the representative hit of each near-duplicate cluster"""
+        async for hit in hits:
+            source = hit['_source']
+            if not self.is_duplicate(source.get('url', ''), source.get('content', '')):
+                yield hit
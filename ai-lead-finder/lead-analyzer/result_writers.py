@@ -0,0 +1,128 @@
+import os
+import csv
+import json
+import heapq
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+CSV_FIELDS = [
+    'url', 'title', 'company', 'emails', 'phones', 'relevance_score', 'potential_value',
+    'intent_classification', 'key_insights', 'technology_stack'
+]
+
+class ReportStats:
+    """Summary statistics maintained incrementally as leads are written"""
+
+    def __init__(self, top_size: int = 10):
+        self.total_leads = 0
+        self.high_quality_leads = 0
+        self.score_sum = 0.0
+        self.leads_by_intent: Dict[str, int] = {}
+        self.top_size = top_size
+        # Min-heap of (score, sequence, lead) holding the best top_size leads
+        self._top = []
+
+    def add(self, lead: Dict[str, Any]):
+        score = lead['relevance_score']
+        self.total_leads += 1
+        self.score_sum += score
+        if score >= 7:
+            self.high_quality_leads += 1
+
+        intent = lead['intent_classification']
+        self.leads_by_intent[intent] = self.leads_by_intent.get(intent, 0) + 1
+
+        # Negative sequence keeps the earliest lead on equal scores
+        entry = (score, -self.total_leads, lead)
+        if len(self._top) < self.top_size:
+            heapq.heappush(self._top, entry)
+        elif entry[:2] > self._top[0][:2]:
+            heapq.heapreplace(self._top, entry)
+
+    @property
+    def average_score(self) -> float:
+        return self.score_sum / self.total_leads if self.total_leads else 0
+
+    def top_leads(self, n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Best leads seen so far, highest relevance first"""
+        ranked = sorted(self._top, key=lambda entry: entry[:2], reverse=True)
+        return [lead for _, _, lead in ranked[:n]]
+
+class LeadResultWriter:
+    """Append leads to ai_leads.csv and ai_leads.jsonl as they are analyzed.
+
+    Rows are buffered and flushed every flush_every leads, so a crash loses
+    at most one batch. close() writes the final ai_leads_detailed.json by
+    streaming the JSONL file back, so the full lead list is never held in
+    memory for writing.
+    """
+
+    def __init__(self, results_dir: str = '/results', flush_every: int = 25):
+        self.results_dir = results_dir
+        self.flush_every = flush_every
+        self.stats = ReportStats()
+
+        self.csv_path = os.path.join(results_dir, 'ai_leads.csv')
+        self.jsonl_path = os.path.join(results_dir, 'ai_leads.jsonl')
+        self.json_path = os.path.join(results_dir, 'ai_leads_detailed.json')
+
+        self._csv_file = open(self.csv_path, 'w', newline='', encoding='utf-8')
+        self._jsonl_file = open(self.jsonl_path, 'w', encoding='utf-8')
+        self._csv_writer = csv.DictWriter(self._csv_file, fieldnames=CSV_FIELDS)
+        self._csv_writer.writeheader()
+        self._pending = 0
+
+    def write_lead(self, lead: Dict[str, Any]):
+        """Append one lead to the CSV and JSONL outputs"""
+        self._csv_writer.writerow({
+            'url': lead['url'],
+            'title': lead['title'],
+            'company': lead['company'],
+            'emails': '; '.join(lead['emails']),
+            'phones': '; '.join(lead['phones']),
+            'relevance_score': lead['relevance_score'],
+            'potential_value': lead['potential_value'],
+            'intent_classification': lead['intent_classification'],
+            'key_insights': ' | '.join(lead['key_insights']),
+            'technology_stack': ' | '.join(lead['technology_stack'])
+        })
+        self._jsonl_file.write(json.dumps(lead, ensure_ascii=False) + '\n')
+        self.stats.add(lead)
+
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self._csv_file.flush()
+        self._jsonl_file.flush()
+        self._pending = 0
+
+    def close(self, updates: Optional[Dict[str, Dict[str, Any]]] = None):
+        """Flush outputs and write the detailed JSON report.
+
+        updates maps lead URL to fields only known after the lead was
+        written, such as its personalized approach or duplicate URLs.
+        """
+        self.flush()
+        self._csv_file.close()
+        self._jsonl_file.close()
+        updates = updates or {}
+
+        with open(self.jsonl_path, 'r', encoding='utf-8') as source, \
+                open(self.json_path, 'w', encoding='utf-8') as f:
+            header = {
+                'generated_at': datetime.now().isoformat(),
+                'total_leads': self.stats.total_leads,
+                'high_quality_leads': self.stats.high_quality_leads,
+                'leads_by_intent': self.stats.leads_by_intent
+            }
+            # Write the header fields, then stream the leads array
+            f.write(json.dumps(header, indent=2, ensure_ascii=False)[:-2])
+            f.write(',\n  "leads": [')
+            for i, line in enumerate(source):
+                lead = json.loads(line)
+                lead.update(updates.get(lead['url'], {}))
+                f.write(',\n    ' if i else '\n    ')
+                f.write(json.dumps(lead, ensure_ascii=False))
+            f.write('\n  ]\n}\n')
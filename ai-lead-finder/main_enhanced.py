@@ -68,8 +68,8 @@ class AIPoweredLeadFinder:
         try:
             # Import and run the enhanced analyzer
             from lead_analyzer.analyzer import EnhancedLeadAnalyzer
-            analyzer = EnhancedLeadAnalyzer()
-            leads = await analyzer.generate_leads_report()
+            async with EnhancedLeadAnalyzer() as analyzer:
+                leads = await analyzer.generate_leads_report()
             print("✅ AI analysis completed!")
             
             # Display results
@@ -107,6 +107,8 @@ class AIPoweredLeadFinder:
         print(f"\n📁 Results saved in:")
         print("   - results/ai_leads.csv (CSV format)")
         print("   - results/ai_leads_detailed.json (Detailed JSON)")
+        print("   - results/ai_leads.jsonl (One JSON record per lead)")
+        print("   - results/ai_companies.json (Top companies with merged contacts)")
         print("   - results/summary_report.md (Summary report)")
 
 async def main():
@@ -1,15 +1,121 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse, Response
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from starlette.routing import Match
+from pydantic import BaseModel, ValidationError, field_validator
 import ollama
+import re
 import json
-from typing import List, Dict, Any
+import time
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, Callable, AsyncIterator, Tuple
 import logging
 from sentence_transformers import SentenceTransformer
 import numpy as np
+from chunking import chunk_text, merge_analyses
+from singleflight import SingleFlight, request_key
+from metrics import (
+    OPERATION_LATENCY, GENERATION_LATENCY, GENERATIONS_IN_FLIGHT, REQUESTS_IN_FLIGHT,
+    BATCH_QUEUE_DEPTH, JSON_PARSE_FAILURES, FALLBACKS, PREFILTER_DECISIONS,
+    COALESCED_REQUESTS, observe_generation
+)
 
 app = FastAPI(title="Open Manus AI Lead Analyzer")
 logging.basicConfig(level=logging.INFO)
 
+# Maximum number of concurrent generations per model, across all requests.
+# Match this to OLLAMA_NUM_PARALLEL on the Ollama server.
+MODEL_CONCURRENCY = 4
+
+# Long pages are analyzed in chunks of at most CHUNK_TOKENS (approximate)
+# tokens, capped at MAX_CHUNKS chunks per page. The budget (~9.2k tokens)
+# covers the lead analyzer's MAX_CONTENT_CHARS; keep the two in step.
+CHUNK_TOKENS = 768
+MAX_CHUNKS = 12
+
+# Qwen classifies lead intent, DeepSeek writes outreach approaches
+INTENT_MODEL = 'qwen:7b'
+APPROACH_MODEL = 'deepseek-coder:6.7b'
+
+# How long Ollama keeps each model loaded after its last request. Qwen
+# handles every page so it stays resident; DeepSeek only runs for top leads.
+MODEL_KEEP_ALIVE = {
+    INTENT_MODEL: '30m',
+    APPROACH_MODEL: '10m',
+}
+
+# Static prompt prefixes. Page-specific data is appended after them so
+# consecutive requests share the longest possible cached prefix.
+INTENT_INSTRUCTIONS = """
+        Analyze this web content for business lead generation in AI-powered performance testing services.
+        
+        Please provide:
+        1. Relevance score (0-10) for AI/performance testing services
+        2. Primary intent (e.g., seeking services, competitor, informational, potential client)
+        3. Potential value (high/medium/low)
+        4. Key insights about their testing needs
+        5. Mentioned competitors or tools
+        6. Technology stack indications
+        
+        Respond in JSON format:
+        {
+            "relevance_score": 0,
+            "intent_classification": "",
+            "potential_value": "",
+            "key_insights": [],
+            "competitor_mentions": [],
+            "technology_stack": []
+        }
+        
+        Web content to analyze:
+"""
+
+APPROACH_INSTRUCTIONS = """
+        Generate a personalized outreach approach focusing on AI-powered performance testing services
+        for the lead described below.
+        Include:
+        - Opening hook based on their apparent needs
+        - Key value propositions to highlight
+        - Specific service recommendations
+        - Call to action
+        
+        Keep it professional and tailored to their specific context.
+"""
+
+# Backoff between attempts to reach Ollama and pull models at startup
+MODEL_LOAD_RETRY_DELAY = 2.0
+MODEL_LOAD_MAX_RETRY_DELAY = 60.0
+
+# Recent intent analyses kept in memory for duplicate pages
+RESULT_CACHE_SIZE = 512
+
+# Extra generations allowed to repair an analysis that is not valid JSON
+MAX_REPAIR_ATTEMPTS = 1
+
+# Embedding pre-filter: pages whose best cosine similarity to any reference
+# "ideal lead" text falls below the threshold skip the LLM entirely
+RELEVANCE_THRESHOLD = 0.25
+
+# Single-lead pre-filter calls arriving within PREFILTER_BATCH_WAIT seconds
+# of each other are embedded together, up to PREFILTER_BATCH_SIZE at a time
+PREFILTER_BATCH_SIZE = 64
+PREFILTER_BATCH_WAIT = 0.01
+
+# all-MiniLM-L6-v2 truncates input at 256 word pieces, so pages are
+# embedded as windows of PREFILTER_WINDOW_TOKENS (approximate) tokens and
+# scored by their best window. The window cap matches the analysis budget.
+PREFILTER_WINDOW_TOKENS = 192
+PREFILTER_MAX_WINDOWS = CHUNK_TOKENS * MAX_CHUNKS // PREFILTER_WINDOW_TOKENS
+REFERENCE_LEAD_TEXTS = [
+    "We are looking for a partner to run load testing and performance testing of our web application.",
+    "Our platform struggles under peak traffic; we need stress testing, scalability and latency analysis.",
+    "Hiring QA engineers with JMeter, Gatling, k6 or Locust experience for performance test automation.",
+    "Testing AI and machine learning systems: model performance, inference latency and reliability.",
+    "Company adopting AI-powered test automation and continuous performance monitoring in CI/CD.",
+]
+
 class LeadAnalysisRequest(BaseModel):
     content: str
     url: str
@@ -19,172 +125,670 @@ class LeadAnalysisResponse(BaseModel):
     relevance_score: float
     intent_classification: str
     potential_value: str
-    recommended_approach: str
-    key_insights: List[str]
-    competitor_mentions: List[str]
-    technology_stack: List[str]
+    recommended_approach: str = ""
+    key_insights: List[str] = []
+    competitor_mentions: List[str] = []
+    technology_stack: List[str] = []
+    
+    @field_validator('relevance_score')
+    @classmethod
+    def clamp_score(cls, value: float) -> float:
+        return min(10.0, max(0.0, value))
+    
+    @field_validator('potential_value')
+    @classmethod
+    def normalize_value(cls, value: str) -> str:
+        value = value.strip().lower()
+        return value if value in ('high', 'medium', 'low') else 'low'
+
+# Markdown code fences models like to wrap JSON in
+CODE_FENCE = re.compile(r'```(?:json)?', re.IGNORECASE)
+
+def extract_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """Return the first JSON object in model output, ignoring any preamble or fences"""
+    text = CODE_FENCE.sub('', text)
+    decoder = json.JSONDecoder()
+    start = text.find('{')
+    while start != -1:
+        try:
+            value, _ = decoder.raw_decode(text, start)
+            if isinstance(value, dict):
+                return value
+        except json.JSONDecodeError:
+            pass
+        start = text.find('{', start + 1)
+    return None
+
+def parse_lead_analysis(text: str) -> Optional[Dict[str, Any]]:
+    """Extract and validate a lead analysis against LeadAnalysisResponse"""
+    data = extract_json_object(text)
+    if data is None:
+        return None
+    try:
+        return LeadAnalysisResponse.model_validate(data).model_dump()
+    except ValidationError as e:
+        logging.warning(f"Lead analysis failed validation: {e.error_count()} errors")
+        return None
+
+class ModelUnavailableError(Exception):
+    """Ollama could not be reached or failed to run a generation"""
 
 class BatchAnalysisRequest(BaseModel):
     leads: List[Dict[str, Any]]
 
 class LLMController:
+    # Models that must be present in Ollama before the service is ready
+    REQUIRED_MODELS = [INTENT_MODEL, APPROACH_MODEL]
+    
     def __init__(self):
-        self.ollama_client = ollama.Client(host='http://ollama:11434')
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.load_models()
+        self.ollama_client = ollama.AsyncClient(host='http://ollama:11434')
+        
+        # Loaded on first use, see embedding_model
+        self._embedding_model = None
+        self._embedding_lock = threading.Lock()
+        self._reference_embeddings = None
+        
+        # Pending single-lead pre-filter calls, see prefilter_one
+        self._prefilter_pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._prefilter_timer: Optional[asyncio.TimerHandle] = None
+        
+        # Readiness state, updated by the background load_models task
+        self.models_ready = False
+        self.model_status = {model: 'pending' for model in self.REQUIRED_MODELS}
+        
+        # One MODEL_CONCURRENCY semaphore per model, created inside the
+        # running event loop on first use, see model_slot
+        self._model_slots: Dict[str, asyncio.Semaphore] = {}
+        
+        # Coalesces duplicate intent analyses (mirrors, ?utm variants, http/https)
+        self.intent_flight = SingleFlight(
+            max_results=RESULT_CACHE_SIZE,
+            on_reuse=lambda source: COALESCED_REQUESTS.labels(source).inc()
+        )
     
-    def load_models(self):
-        """Load required AI models"""
-        try:
-            # Pull Qwen model
-            self.ollama_client.pull('qwen:7b')
-            logging.info("Qwen model loaded")
-            
-            # Pull DeepSeek model
-            self.ollama_client.pull('deepseek-coder:6.7b')
-            logging.info("DeepSeek model loaded")
-            
-        except Exception as e:
-            logging.error(f"Error loading models: {e}")
+    @property
+    def embedding_model(self) -> SentenceTransformer:
+        """SentenceTransformer, loaded on first access"""
+        if self._embedding_model is None:
+            with self._embedding_lock:
+                if self._embedding_model is None:
+                    self._embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+                    logging.info("Embedding model loaded")
+        return self._embedding_model
     
-    def analyze_lead_intent(self, content: str, url: str, title: str) -> Dict[str, Any]:
-        """Analyze lead content using Qwen for intent classification"""
+    def relevance_similarity(self, texts: List[str]) -> np.ndarray:
+        """Best cosine similarity of each text to the reference lead texts.
         
-        prompt = f"""
-        Analyze this web content for business lead generation in AI-powered performance testing services.
+        All texts are embedded in one batched pass; embeddings are normalized
+        so similarity is a single matrix product.
+        """
+        if self._reference_embeddings is None:
+            self._reference_embeddings = self.embedding_model.encode(
+                REFERENCE_LEAD_TEXTS, normalize_embeddings=True, convert_to_numpy=True
+            )
         
-        URL: {url}
-        Title: {title}
-        Content: {content[:2000]}...
+        embeddings = self.embedding_model.encode(
+            texts, batch_size=64, normalize_embeddings=True, convert_to_numpy=True
+        )
+        return (embeddings @ self._reference_embeddings.T).max(axis=1)
+    
+    async def prefilter(self, leads: List[Dict[str, Any]]) -> np.ndarray:
+        """Similarity score for each lead, computed off the event loop.
         
-        Please provide:
-        1. Relevance score (0-10) for AI/performance testing services
-        2. Primary intent (e.g., seeking services, competitor, informational, potential client)
-        3. Potential value (high/medium/low)
-        4. Key insights about their testing needs
-        5. Mentioned competitors or tools
-        6. Technology stack indications
+        Every window of every lead is embedded in one batch; a lead scores
+        the best similarity of its windows.
+        """
+        texts = []
+        starts = []
+        for lead in leads:
+            title = lead.get('title', '')
+            windows = chunk_text(lead.get('content', ''), max_tokens=PREFILTER_WINDOW_TOKENS,
+                                 max_chunks=PREFILTER_MAX_WINDOWS,
+                                 source=f"{lead.get('url', 'page')} (pre-filter)")
+            starts.append(len(texts))
+            texts.extend(f"{title}\n{window}" for window in windows)
+        window_similarities = await asyncio.to_thread(self.relevance_similarity, texts)
+        similarities = np.maximum.reduceat(window_similarities, starts)
+        passed = int((similarities >= RELEVANCE_THRESHOLD).sum())
+        PREFILTER_DECISIONS.labels('pass').inc(passed)
+        PREFILTER_DECISIONS.labels('reject').inc(len(leads) - passed)
+        return similarities
+    
+    async def prefilter_one(self, lead: Dict[str, Any]) -> float:
+        """Similarity score of one lead, micro-batched with concurrent callers.
         
-        Respond in JSON format:
-        {{
+        /analyze-lead receives one page per request; collecting the pages
+        of concurrent requests keeps the embedding model on batched passes
+        instead of one thread hop and encode call per page.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._prefilter_pending.append((lead, future))
+        if len(self._prefilter_pending) >= PREFILTER_BATCH_SIZE:
+            self._flush_prefilter()
+        elif self._prefilter_timer is None:
+            self._prefilter_timer = loop.call_later(PREFILTER_BATCH_WAIT, self._flush_prefilter)
+        return await future
+    
+    def _flush_prefilter(self):
+        if self._prefilter_timer is not None:
+            self._prefilter_timer.cancel()
+            self._prefilter_timer = None
+        pending, self._prefilter_pending = self._prefilter_pending, []
+        if pending:
+            asyncio.ensure_future(self._run_prefilter(pending))
+    
+    async def _run_prefilter(self, pending: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        try:
+            similarities = await self.prefilter([lead for lead, _ in pending])
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), similarity in zip(pending, similarities):
+            # Callers that went away leave a cancelled future behind
+            if not future.done():
+                future.set_result(float(similarity))
+    
+    def get_rejected_analysis(self, similarity: float) -> Dict[str, Any]:
+        """Analysis returned for pages rejected by the embedding pre-filter"""
+        return {
             "relevance_score": 0,
-            "intent_classification": "",
-            "potential_value": "",
-            "key_insights": [],
+            "intent_classification": "irrelevant",
+            "potential_value": "low",
+            "recommended_approach": "",
+            "key_insights": [f"Rejected by embedding pre-filter (similarity {similarity:.2f})"],
             "competitor_mentions": [],
             "technology_stack": []
-        }}
+        }
+    
+    async def load_models(self):
+        """Pull required AI models, retrying with backoff until all are available.
+        
+        Ollama often starts after this service, so failures are retried
+        instead of leaving /ready at 503 until the container restarts.
+        """
+        delay = MODEL_LOAD_RETRY_DELAY
+        while True:
+            try:
+                await self.ensure_models()
+                self.models_ready = True
+                return
+            except Exception as e:
+                logging.error(f"Error loading models, retrying in {delay:.0f}s: {e}")
+                for model, status in self.model_status.items():
+                    if status != 'available':
+                        self.model_status[model] = f'error: {e}'
+            
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MODEL_LOAD_MAX_RETRY_DELAY)
+    
+    async def ensure_models(self):
+        """Pull required AI models that Ollama does not already have"""
+        listing = await self.ollama_client.list()
+        available = set()
+        for model in listing.get('models', []):
+            name = model.get('name', '')
+            available.add(name)
+            if name.endswith(':latest'):
+                available.add(name[:-len(':latest')])
+        
+        for model in self.REQUIRED_MODELS:
+            if model in available:
+                self.model_status[model] = 'available'
+                continue
+            
+            self.model_status[model] = 'pulling'
+            logging.info(f"Pulling {model}")
+            await self.ollama_client.pull(model)
+            self.model_status[model] = 'available'
+            logging.info(f"{model} loaded")
+    
+    @asynccontextmanager
+    async def model_slot(self, model: str):
+        """Hold one of the MODEL_CONCURRENCY generation slots of model"""
+        slots = self._model_slots.get(model)
+        if slots is None:
+            slots = self._model_slots[model] = asyncio.Semaphore(MODEL_CONCURRENCY)
+        async with slots:
+            GENERATIONS_IN_FLIGHT.labels(model).inc()
+            try:
+                yield
+            finally:
+                GENERATIONS_IN_FLIGHT.labels(model).dec()
+    
+    async def generate(self, model: str, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Run one non-streaming Ollama generation, recording latency and token metrics"""
+        async with self.model_slot(model):
+            with GENERATION_LATENCY.labels(model).time():
+                response = await self.ollama_client.generate(
+                    model=model,
+                    prompt=prompt,
+                    keep_alive=MODEL_KEEP_ALIVE[model],
+                    **kwargs
+                )
+        
+        observe_generation(model, response)
+        return response
+    
+    async def analyze_lead_intent(self, content: str, url: str, title: str) -> Optional[Dict[str, Any]]:
+        """Analyze lead content using Qwen for intent classification.
+        
+        Identical concurrent requests (same normalized URL and content) share
+        one generation, and recent results are served from memory. Returns
+        None when the model output for the page could not be turned into a
+        valid analysis; callers must not substitute a made-up score, which
+        would rank as a real lead. Raises ModelUnavailableError when Ollama
+        failed and no chunk could be analyzed.
+        """
+        key = request_key(url, title, content)
+        analysis = await self.intent_flight.run(key, lambda: self.generate_lead_intent(content, url, title))
+        
+        if analysis is None:
+            FALLBACKS.labels('analyze_lead_intent').inc()
+            return None
+        return dict(analysis)
+    
+    async def generate_lead_intent(self, content: str, url: str, title: str) -> Optional[Dict[str, Any]]:
+        """Run the intent analysis, returning None if no chunk produced a valid analysis.
+        
+        Long pages are split into token-bounded chunks that are analyzed
+        concurrently and merged, so signals past the first chunk are kept.
+        """
+        chunks = chunk_text(content, max_tokens=CHUNK_TOKENS, max_chunks=MAX_CHUNKS, source=url)
+        # Timed here rather than around the single-flight, so cache hits
+        # and shared waits do not skew the latency histogram
+        with OPERATION_LATENCY.labels('analyze_lead_intent').time():
+            # Concurrency is bounded per model in generate()
+            results = await asyncio.gather(
+                *(self.analyze_chunk(chunk, url, title) for chunk in chunks), return_exceptions=True
+            )
+        analyses = [r for r in results if isinstance(r, dict)]
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if not analyses:
+            # An outage is reported as such, not as unusable output
+            if errors:
+                raise errors[0]
+            return None
+        if errors:
+            logging.warning(f"Analyzed {len(analyses)} of {len(chunks)} chunks of {url}: {errors[0]}")
+        return analyses[0] if len(analyses) == 1 else merge_analyses(analyses)
+    
+    async def analyze_chunk(self, content: str, url: str, title: str) -> Optional[Dict[str, Any]]:
+        """Analyze one chunk of page content with Qwen.
+        
+        Returns None when the output is unusable even after repair, and
+        raises ModelUnavailableError when the generation itself failed.
+        """
+        
+        # Static instructions first: identical prompt prefixes let Ollama
+        # reuse the cached prefix instead of re-evaluating it for every page
+        prompt = INTENT_INSTRUCTIONS + f"""
+        URL: {url}
+        Title: {title}
+        Content: {content}
         """
         
         try:
-            response = self.ollama_client.generate(
-                model='qwen:7b',
-                prompt=prompt,
+            # JSON mode constrains Qwen to emit a single JSON object
+            response = await self.generate(
+                INTENT_MODEL,
+                prompt,
+                format='json',
                 options={'temperature': 0.1}
             )
             
-            # Parse JSON response
-            analysis = json.loads(response['response'])
+            output = response['response']
+            analysis = parse_lead_analysis(output)
+            
+            # Only pay for another generation when the output is unusable
+            for _ in range(MAX_REPAIR_ATTEMPTS):
+                if analysis is not None:
+                    break
+                JSON_PARSE_FAILURES.labels('analysis').inc()
+                output = await self.repair_analysis(output)
+                analysis = parse_lead_analysis(output)
+            
+            if analysis is None:
+                JSON_PARSE_FAILURES.labels('repair').inc()
+            
             return analysis
             
         except Exception as e:
             logging.error(f"Error in lead analysis: {e}")
-            return self.get_fallback_analysis()
+            raise ModelUnavailableError(str(e)) from e
     
-    def get_fallback_analysis(self):
-        """Fallback analysis if AI fails"""
-        return {
-            "relevance_score": 5,
-            "intent_classification": "unknown",
-            "potential_value": "medium",
-            "key_insights": ["Analysis unavailable"],
-            "competitor_mentions": [],
-            "technology_stack": []
-        }
-    
-    def generate_personalized_approach(self, analysis: Dict, contact_info: Dict) -> str:
-        """Generate personalized outreach approach using DeepSeek"""
-        
+    async def repair_analysis(self, output: str) -> str:
+        """Ask Qwen to rewrite a malformed analysis as valid JSON"""
         prompt = f"""
-        Based on this lead analysis:
-        {json.dumps(analysis, indent=2)}
+        The following lead analysis is not valid JSON or is missing fields.
+        Rewrite it as a single JSON object with exactly these fields:
+        relevance_score (number 0-10), intent_classification (string),
+        potential_value ("high", "medium" or "low"), key_insights (list of strings),
+        competitor_mentions (list of strings), technology_stack (list of strings).
         
-        Contact info: {contact_info}
+        Analysis:
+        {output[:4000]}
+        """
         
-        Generate a personalized outreach approach focusing on AI-powered performance testing services.
-        Include:
-        - Opening hook based on their apparent needs
-        - Key value propositions to highlight
-        - Specific service recommendations
-        - Call to action
+        response = await self.generate(
+            INTENT_MODEL,
+            prompt,
+            format='json',
+            options={'temperature': 0}
+        )
+        return response['response']
+    
+    def build_approach_prompt(self, analysis: Dict, contact_info: Dict) -> str:
+        return APPROACH_INSTRUCTIONS + f"""
+        Lead analysis:
+        {json.dumps(analysis, indent=2)}
         
-        Keep it professional and tailored to their specific context.
+        Contact info: {contact_info}
         """
-        
+    
+    async def generate_personalized_approach(self, analysis: Dict, contact_info: Dict) -> str:
+        """Generate personalized outreach approach using DeepSeek"""
         try:
-            response = self.ollama_client.generate(
-                model='deepseek-coder:6.7b',
-                prompt=prompt,
-                options={'temperature': 0.3}
-            )
+            with OPERATION_LATENCY.labels('generate_personalized_approach').time():
+                response = await self.generate(
+                    APPROACH_MODEL,
+                    self.build_approach_prompt(analysis, contact_info),
+                    options={'temperature': 0.3}
+                )
             
             return response['response']
             
         except Exception as e:
             logging.error(f"Error generating approach: {e}")
+            FALLBACKS.labels('generate_personalized_approach').inc()
             return "Personalized approach generation failed."
+    
+    async def stream_personalized_approach(self, analysis: Dict, contact_info: Dict) -> AsyncIterator[str]:
+        """Generate a personalized outreach approach, yielding tokens as DeepSeek produces them.
+        
+        Latency is recorded however the stream ends; a failed stream counts
+        as a fallback like generate_personalized_approach, then re-raises.
+        """
+        async with self.model_slot(APPROACH_MODEL):
+            started = time.perf_counter()
+            try:
+                stream = await self.ollama_client.generate(
+                    model=APPROACH_MODEL,
+                    prompt=self.build_approach_prompt(analysis, contact_info),
+                    stream=True,
+                    options={'temperature': 0.3},
+                    keep_alive=MODEL_KEEP_ALIVE[APPROACH_MODEL]
+                )
+                async for part in stream:
+                    if part.get('response'):
+                        yield part['response']
+                    if part.get('done'):
+                        observe_generation(APPROACH_MODEL, part)
+            except Exception:
+                FALLBACKS.labels('generate_personalized_approach').inc()
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                GENERATION_LATENCY.labels(APPROACH_MODEL).observe(elapsed)
+                OPERATION_LATENCY.labels('generate_personalized_approach').observe(elapsed)
 
 llm_controller = LLMController()
 
+def route_template(request: Request) -> str:
+    """Path template of the route serving request, e.g. /analyze-lead.
+    
+    Used as a metric label instead of the raw path, so requests for
+    arbitrary URLs cannot create unbounded label values.
+    """
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return 'unmatched'
+
+@app.middleware("http")
+async def track_requests_in_flight(request: Request, call_next):
+    """Count requests being handled per route; scrapes of /metrics are not tracked.
+    
+    A request stays in flight until its body has been sent, so streaming
+    responses such as /analyze-batch/stream count while they stream.
+    """
+    route = route_template(request)
+    if route == '/metrics':
+        return await call_next(request)
+    
+    REQUESTS_IN_FLIGHT.labels(route).inc()
+    try:
+        response = await call_next(request)
+    except BaseException:
+        REQUESTS_IN_FLIGHT.labels(route).dec()
+        raise
+    
+    body = response.body_iterator
+    
+    async def tracked_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            REQUESTS_IN_FLIGHT.labels(route).dec()
+    
+    response.body_iterator = tracked_body()
+    return response
+
+@app.on_event("startup")
+async def start_model_loading():
+    """Check and pull models in the background so the port binds immediately"""
+    app.state.model_loader = asyncio.create_task(llm_controller.load_models())
+
 @app.post("/analyze-lead", response_model=LeadAnalysisResponse)
 async def analyze_lead(request: LeadAnalysisRequest):
-    """Analyze a single lead using AI models"""
+    """Analyze a single lead using AI models.
+    
+    Answers 503 while models are loading or Ollama fails (worth retrying)
+    and 422 when the model output for this page is unusable (final).
+    """
+    if not llm_controller.models_ready:
+        raise HTTPException(status_code=503, detail="Models are not ready")
+    
     try:
-        analysis = llm_controller.analyze_lead_intent(
+        similarity = await llm_controller.prefilter_one(request.model_dump())
+        if similarity < RELEVANCE_THRESHOLD:
+            return LeadAnalysisResponse(**llm_controller.get_rejected_analysis(similarity))
+        
+        analysis = await llm_controller.analyze_lead_intent(
             request.content, request.url, request.title
         )
+        if analysis is None:
+            # An error rather than a placeholder score, so clients fall back
+            # on their own and never cache or rank a fake analysis
+            raise HTTPException(status_code=422, detail="Model output for this page could not be parsed into an analysis")
         
         return LeadAnalysisResponse(**analysis)
         
+    except HTTPException:
+        raise
+    except ModelUnavailableError as e:
+        raise HTTPException(status_code=503, detail=f"Model unavailable: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/analyze-batch")
-async def analyze_batch(request: BatchAnalysisRequest):
-    """Analyze multiple leads in batch"""
-    results = []
+def elapsed_ms(started: float, finished: float) -> float:
+    return round((finished - started) * 1000, 1)
+
+@asynccontextmanager
+async def batch_slot(slots: asyncio.Semaphore):
+    """Acquire a model slot, counting the wait in the batch queue depth gauge"""
+    BATCH_QUEUE_DEPTH.inc()
+    try:
+        await slots.acquire()
+    finally:
+        BATCH_QUEUE_DEPTH.dec()
+    try:
+        yield
+    finally:
+        slots.release()
+
+async def run_batch(leads: List[Dict[str, Any]],
+                    emit: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """Process batch leads, up to MODEL_CONCURRENCY leads at a time.
+    
+    Generations themselves are bounded per model by LLMController, shared
+    with every other request.
+    
+    Work is scheduled by model: every intent analysis (Qwen) runs before any
+    approach generation (DeepSeek), so Ollama loads each model once per
+    batch instead of swapping them for every lead. Leads that already carry
+    an 'analysis' skip the first phase. Results keep the order of leads;
+    when emit is given, analysis, token and result events are emitted with
+    the index of their lead as they are produced.
+    """
+    started = time.perf_counter()
+    slots = asyncio.Semaphore(MODEL_CONCURRENCY)
+    results: List[Dict[str, Any]] = [{'url': lead.get('url')} for lead in leads]
+    analyses: List[Optional[Dict[str, Any]]] = [lead.get('analysis') for lead in leads]
+    analysis_done = [started] * len(leads)
+    completed = set()
+    
+    def emit_for(index: int, event: Dict[str, Any]):
+        if emit:
+            emit({**event, 'index': index, 'url': leads[index].get('url')})
+    
+    def finish(index: int, **fields):
+        completed.add(index)
+        results[index].update(fields)
+        emit_for(index, {'type': 'result', **results[index]})
+    
+    # One batched embedding pass decides which unanalyzed leads reach the LLMs
+    pending = [i for i, analysis in enumerate(analyses) if analysis is None]
+    if pending:
+        similarities = await llm_controller.prefilter([leads[i] for i in pending])
+        for index, similarity in zip(pending, similarities):
+            if similarity < RELEVANCE_THRESHOLD:
+                analyses[index] = llm_controller.get_rejected_analysis(float(similarity))
+                finish(index, analysis=analyses[index], personalized_approach='',
+                       skipped='below relevance threshold')
     
-    for lead in request.leads:
+    # Phase 1: intent analysis with Qwen
+    async def analyze(index: int):
+        lead = leads[index]
         try:
-            analysis = llm_controller.analyze_lead_intent(
-                lead.get('content', ''),
-                lead.get('url', ''),
-                lead.get('title', '')
-            )
-            
-            results.append({
-                'url': lead.get('url'),
-                'analysis': analysis,
-                'personalized_approach': llm_controller.generate_personalized_approach(
-                    analysis, lead.get('contact_info', {})
+            async with batch_slot(slots):
+                analyses[index] = await llm_controller.analyze_lead_intent(
+                    lead.get('content', ''), lead.get('url', ''), lead.get('title', '')
                 )
-            })
-            
+            if analyses[index] is None:
+                raise RuntimeError("Intent analysis failed")
+            analysis_done[index] = time.perf_counter()
+            emit_for(index, {'type': 'analysis', 'analysis': analyses[index]})
         except Exception as e:
             logging.error(f"Error analyzing lead {lead.get('url')}: {e}")
-            results.append({'url': lead.get('url'), 'error': str(e)})
+            finish(index, error=str(e),
+                   latency_ms={'total': elapsed_ms(started, time.perf_counter())})
+    
+    await asyncio.gather(*(analyze(i) for i, analysis in enumerate(analyses) if analysis is None))
+    
+    # Phase 2: approach generation with DeepSeek
+    async def approach(index: int):
+        lead = leads[index]
+        contact_info = lead.get('contact_info', {})
+        try:
+            async with batch_slot(slots):
+                if emit:
+                    tokens = []
+                    async for token in llm_controller.stream_personalized_approach(analyses[index], contact_info):
+                        tokens.append(token)
+                        emit_for(index, {'type': 'token', 'token': token})
+                    text = ''.join(tokens)
+                else:
+                    text = await llm_controller.generate_personalized_approach(analyses[index], contact_info)
+            finished = time.perf_counter()
+            finish(index, analysis=analyses[index], personalized_approach=text, latency_ms={
+                'analysis': elapsed_ms(started, analysis_done[index]),
+                'approach': elapsed_ms(analysis_done[index], finished),
+                'total': elapsed_ms(started, finished)
+            })
+        except Exception as e:
+            logging.error(f"Error generating approach for {lead.get('url')}: {e}")
+            finish(index, analysis=analyses[index], error=str(e),
+                   latency_ms={'total': elapsed_ms(started, time.perf_counter())})
+    
+    await asyncio.gather(*(approach(i) for i in range(len(leads)) if i not in completed))
+    
+    return results
+
+@app.post("/analyze-batch")
+async def analyze_batch(request: BatchAnalysisRequest):
+    """Analyze multiple leads in batch, running up to MODEL_CONCURRENCY generations per model"""
+    started = time.perf_counter()
+    results = await run_batch(request.leads)
+    
+    return {
+        'results': results,
+        'batch_latency_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
+
+@app.post("/analyze-batch/stream")
+async def analyze_batch_stream(request: BatchAnalysisRequest):
+    """Analyze a batch, streaming NDJSON events as they are produced.
+    
+    Each line is a JSON object with a 'type': 'analysis' and 'token' events
+    while a lead is in progress, a 'result' per finished lead (same shape as
+    /analyze-batch results) and a final 'done' with the batch latency.
+    """
+    started = time.perf_counter()
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    async def produce():
+        try:
+            await run_batch(request.leads, queue.put_nowait)
+        finally:
+            queue.put_nowait(None)
+    
+    async def events():
+        task = asyncio.create_task(produce())
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield json.dumps(event, ensure_ascii=False) + '\n'
+            
+            await task
+            yield json.dumps({
+                'type': 'done',
+                'batch_latency_ms': round((time.perf_counter() - started) * 1000, 1)
+            }) + '\n'
+        finally:
+            task.cancel()
     
-    return {'results': results}
+    return StreamingResponse(events(), media_type='application/x-ndjson')
 
 @app.get("/models")
 async def get_models():
     """Get available AI models"""
     try:
-        models = llm_controller.ollama_client.list()
+        models = await llm_controller.ollama_client.list()
         return {'models': models}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once all required models are available, 503 until then"""
+    status = {'ready': llm_controller.models_ready, 'models': llm_controller.model_status}
+    if not llm_controller.models_ready:
+        raise HTTPException(status_code=503, detail=status)
+    return status
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics in the text exposition format"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/")
 async def root():
     return {"message": "Open Manus AI Lead Analyzer - Running Locally"}
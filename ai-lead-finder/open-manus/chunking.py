@@ -0,0 +1,95 @@
+import re
+import logging
+from typing import List, Dict, Any
+
+# Approximate tokenizer: words and individual punctuation marks. BPE
+# tokenizers used by Qwen and DeepSeek produce slightly more tokens than
+# this for English text, so chunk budgets should leave some headroom.
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+# Preferred split points, strongest first: paragraphs, then sentence ends
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+VALUE_RANK = {'low': 0, 'medium': 1, 'high': 2}
+
+def count_tokens(text: str) -> int:
+    """Approximate number of model tokens in text"""
+    return len(TOKEN_PATTERN.findall(text))
+
+def _split_oversized(text: str, max_tokens: int) -> List[str]:
+    """Hard split of a single sentence that exceeds max_tokens"""
+    spans = [m.span() for m in TOKEN_PATTERN.finditer(text)]
+    return [text[spans[i][0]:spans[min(i + max_tokens, len(spans)) - 1][1]]
+            for i in range(0, len(spans), max_tokens)]
+
+def chunk_text(text: str, max_tokens: int = 512, max_chunks: int = 8, source: str = '') -> List[str]:
+    """Split text into chunks of at most max_tokens, on paragraph or sentence boundaries.
+
+    At most max_chunks chunks are returned, which bounds the number of LLM
+    calls spent on a single very long page. Dropping the rest of a page is
+    logged with source (usually its URL).
+    """
+    if count_tokens(text) <= max_tokens:
+        return [text]
+
+    pieces = []
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        for sentence in SENTENCE_BREAK.split(paragraph.strip()):
+            if not sentence:
+                continue
+            tokens = count_tokens(sentence)
+            if tokens > max_tokens:
+                pieces.extend((part, max_tokens) for part in _split_oversized(sentence, max_tokens))
+            else:
+                pieces.append((sentence, tokens))
+        pieces.append(('\n\n', 0))
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for i, (piece, tokens) in enumerate(pieces):
+        if current_tokens + tokens > max_tokens and current_tokens:
+            chunks.append(''.join(current).strip())
+            if len(chunks) == max_chunks:
+                dropped = sum(t for _, t in pieces[i:])
+                logging.warning(f"Dropped ~{dropped} tokens past {max_chunks} chunks of {source or 'page'}")
+                return chunks
+            current = []
+            current_tokens = 0
+        current.append(piece if piece == '\n\n' else piece + ' ')
+        current_tokens += tokens
+
+    if current_tokens:
+        chunks.append(''.join(current).strip())
+    return chunks[:max_chunks]
+
+def _merge_lists(values: List[List[str]], limit: int) -> List[str]:
+    merged = {}
+    for items in values:
+        for item in items or []:
+            if isinstance(item, str) and item.strip():
+                merged.setdefault(item.strip(), None)
+    return list(merged)[:limit]
+
+def merge_analyses(analyses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Reduce per-chunk analyses of one page into a single analysis.
+
+    The page is as relevant as its most relevant chunk, and that chunk also
+    decides the intent. List fields are unioned in chunk order.
+    """
+    best = max(analyses, key=lambda a: a.get('relevance_score', 0))
+    potential_value = max(
+        (a.get('potential_value', 'low') for a in analyses),
+        key=lambda v: VALUE_RANK.get(str(v).lower(), 0)
+    )
+
+    return {
+        **best,
+        "relevance_score": best.get('relevance_score', 0),
+        "intent_classification": best.get('intent_classification', 'unknown'),
+        "potential_value": potential_value,
+        "key_insights": _merge_lists([a.get('key_insights') for a in analyses], 10),
+        "competitor_mentions": _merge_lists([a.get('competitor_mentions') for a in analyses], 20),
+        "technology_stack": _merge_lists([a.get('technology_stack') for a in analyses], 20)
+    }
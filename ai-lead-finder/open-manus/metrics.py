@@ -0,0 +1,82 @@
+from typing import Dict, Any
+from prometheus_client import Counter, Gauge, Histogram
+
+# LLM calls take seconds to minutes, so the default buckets are too small
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+
+OPERATION_LATENCY = Histogram(
+    'open_manus_operation_latency_seconds',
+    'End-to-end latency of an LLMController operation',
+    ['operation'],
+    buckets=LATENCY_BUCKETS
+)
+
+GENERATION_LATENCY = Histogram(
+    'open_manus_generation_latency_seconds',
+    'Latency of a single Ollama generation',
+    ['model'],
+    buckets=LATENCY_BUCKETS
+)
+
+TOKENS_PER_SECOND = Histogram(
+    'open_manus_tokens_per_second',
+    'Generation speed reported by Ollama (eval_count / eval_duration)',
+    ['model'],
+    buckets=(1, 2, 5, 10, 15, 20, 30, 40, 60, 80, 120)
+)
+
+GENERATED_TOKENS = Counter(
+    'open_manus_generated_tokens_total',
+    'Tokens generated by Ollama',
+    ['model']
+)
+
+GENERATIONS_IN_FLIGHT = Gauge(
+    'open_manus_generations_in_flight',
+    'Ollama generations currently running',
+    ['model']
+)
+
+REQUESTS_IN_FLIGHT = Gauge(
+    'open_manus_requests_in_flight',
+    'HTTP requests currently being handled, until their body is sent',
+    ['route']
+)
+
+BATCH_QUEUE_DEPTH = Gauge(
+    'open_manus_batch_queue_depth',
+    'Batch items waiting for a model concurrency slot'
+)
+
+JSON_PARSE_FAILURES = Counter(
+    'open_manus_json_parse_failures_total',
+    'Model outputs that were not a valid lead analysis',
+    ['stage']
+)
+
+FALLBACKS = Counter(
+    'open_manus_fallbacks_total',
+    'Operations that produced no usable model output and returned an error or fallback',
+    ['operation']
+)
+
+PREFILTER_DECISIONS = Counter(
+    'open_manus_prefilter_decisions_total',
+    'Embedding pre-filter outcomes',
+    ['decision']
+)
+
+COALESCED_REQUESTS = Counter(
+    'open_manus_coalesced_requests_total',
+    'Intent analyses answered without a new generation',
+    ['source']
+)
+
+def observe_generation(model: str, response: Dict[str, Any]):
+    """Record token counts and speed from a final Ollama response"""
+    eval_count = response.get('eval_count') or 0
+    eval_duration = response.get('eval_duration') or 0
+    if eval_count:
+        GENERATED_TOKENS.labels(model).inc(eval_count)
+    if eval_count and eval_duration:
+        TOKENS_PER_SECOND.labels(model).observe(eval_count / (eval_duration / 1e9))
@@ -0,0 +1,91 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# Query parameters that only track where a visitor came from
+TRACKING_PARAMS = {'gclid', 'fbclid', 'mc_cid', 'mc_eid', 'ref', 'ref_src', 'igshid'}
+
+def normalize_url(url: str) -> str:
+    """Canonical form of url so mirrors of the same page share a key.
+
+    The scheme, a leading 'www.', the fragment, a trailing slash and
+    tracking parameters (utm_* and friends) are dropped, the host is
+    lowercased and the remaining query parameters are sorted.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port:
+        host = f"{host}:{parts.port}"
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip('/') or '/'
+    return f"{host}{path}" + (f"?{urlencode(query)}" if query else '')
+
+def request_key(url: str, *content: str) -> Tuple[str, str]:
+    """Key of an analysis request: normalized URL plus a hash of its content"""
+    digest = hashlib.sha256()
+    for part in content:
+        digest.update(part.encode('utf-8', errors='replace'))
+        digest.update(b'\0')
+    return normalize_url(url), digest.hexdigest()
+
+class SingleFlight:
+    """Share one in-flight computation among concurrent identical requests.
+
+    The first caller for a key starts the computation; callers arriving
+    while it runs await the same task. Results are kept in a small LRU so
+    repeats shortly afterwards are answered without recomputing. A result
+    of None means the computation failed and is never cached.
+    """
+
+    def __init__(self, max_results: int = 512,
+                 on_reuse: Optional[Callable[[str], None]] = None):
+        self.max_results = max_results
+        # Called with 'cache' or 'shared' whenever a request is not computed
+        self.on_reuse = on_reuse
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._results: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self.computed = 0
+        self.shared = 0
+        self.cached = 0
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        if key in self._results:
+            self._results.move_to_end(key)
+            self.cached += 1
+            if self.on_reuse:
+                self.on_reuse('cache')
+            return self._results[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._complete(key, done))
+            self.computed += 1
+        else:
+            self.shared += 1
+            if self.on_reuse:
+                self.on_reuse('shared')
+
+        # Shield so one caller disconnecting does not cancel the shared work
+        return await asyncio.shield(task)
+
+    def _complete(self, key: Hashable, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        result = task.result()
+        if result is None:
+            return
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
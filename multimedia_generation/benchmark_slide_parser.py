@@ -0,0 +1,108 @@
+"""Benchmark slide Markdown parsing on very large synthetic decks.
+
+Compares the two original parsers (parse_slides from generate_slide_audio
+and parse_speaker_notes from replace_speaker_notes) with the shared
+streaming slide_parser, for time and peak memory.
+
+    python benchmark_slide_parser.py [slides] [lines_per_slide]
+"""
+import os
+import re
+import sys
+import time
+import random
+import tempfile
+import tracemalloc
+from slide_parser import read_slides
+
+WORDS = ("testing AI based software systems model drift data quality regression "
+         "metamorphic oracle coverage robustness fairness evaluation pipeline").split()
+
+def legacy_parse_slides(path):
+    """The original generate_slide_audio.parse_slides, including reading the file"""
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        content = f.read()
+    slides = []
+    lines = content.splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        slide_match = re.match(r'^##\s+Slide\s+(\d+):\s*(.*)', line, re.IGNORECASE)
+        if slide_match:
+            full_title = f"Slide {slide_match.group(1)}: {slide_match.group(2)}"
+            i += 1
+            notes_lines = []
+            while i < len(lines):
+                current_line = lines[i].strip()
+                if re.match(r'^##\s+Slide\s+\d+:', current_line):
+                    break
+                if current_line:
+                    notes_lines.append(current_line)
+                i += 1
+            notes = re.sub(r'\s+', ' ', ' '.join(notes_lines)).strip()
+            slides.append((full_title, notes))
+        else:
+            i += 1
+    return slides
+
+def legacy_parse_speaker_notes(path):
+    """The original replace_speaker_notes.parse_speaker_notes"""
+    notes_dict = {}
+    current_slide = None
+    current_notes = []
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            match = re.match(r'##\s*Slide\s*(\d+):', line)
+            if match:
+                if current_slide is not None and current_notes:
+                    notes_dict[current_slide] = '\n'.join(current_notes).strip()
+                current_slide = int(match.group(1))
+                current_notes = []
+            elif current_slide is not None:
+                current_notes.append(line)
+    if current_slide is not None and current_notes:
+        notes_dict[current_slide] = '\n'.join(current_notes).strip()
+    return notes_dict
+
+def write_deck(path, slides, lines_per_slide, rng):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("# Speaker Notes\n\n")
+        for number in range(1, slides + 1):
+            f.write(f"## Slide {number}: {' '.join(rng.sample(WORDS, 3)).title()}\n\n")
+            for line in range(lines_per_slide):
+                f.write(' '.join(rng.choice(WORDS) for _ in range(14)) + '\n')
+                if line % 4 == 3:
+                    f.write('\n')
+            f.write('\n')
+
+def timed(label, func, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<34} {elapsed * 1000:10.1f} ms {peak / 2 ** 20:10.1f} MB peak")
+    return result
+
+def main():
+    slides = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    lines_per_slide = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'deck.md')
+        write_deck(path, slides, lines_per_slide, random.Random(42))
+        print(f"📄 {slides} slides x {lines_per_slide} lines ({os.path.getsize(path) / 2 ** 20:.1f} MB)")
+
+        legacy_audio = timed("legacy parse_slides", legacy_parse_slides, path)
+        legacy_notes = timed("legacy parse_speaker_notes", legacy_parse_speaker_notes, path)
+        records = timed("slide_parser.read_slides", lambda: list(read_slides(path)))
+        timed("slide_parser streaming (count)", lambda: sum(1 for _ in read_slides(path)))
+
+        assert [(s.full_title, s.notes) for s in records] == legacy_audio
+        assert {s.number: s.notes_text for s in records if s.lines} == legacy_notes
+        print("\n✅ Results match both legacy parsers")
+
+if __name__ == "__main__":
+    main()
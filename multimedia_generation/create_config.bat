@@ -17,6 +17,9 @@ echo JPG_FOLDER,jpg,Folder containing JPG slide images
 echo VIDEO_OUTPUT,Presentation.mp4,Output video file name
 echo TOTAL_SLIDES,40,Total number of slides
 echo FFMPEG_PATH,C:\ffmpeg\bin\ffmpeg.exe,Path to FFmpeg executable
+echo TTS_WORKERS,4,Number of concurrent TTS requests
+echo TTS_MAX_RETRIES,4,Retries for a slide after a transient TTS failure
+echo TTS_RETRY_BACKOFF_S,1.0,Base delay before the first TTS retry ^(s^)
 ) > config.csv
 
 echo Default config.csv created successfully!
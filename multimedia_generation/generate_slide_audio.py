@@ -1,10 +1,17 @@
 # generate_slide_audio.py
+import io
 import os
 import re
+import json
+import time
+import hashlib
+import random
 import asyncio
+import aiohttp
 import edge_tts
 from pydub import AudioSegment
 from config_loader import config
+from slide_parser import read_slides
 
 # Load configuration
 INPUT_FILE = config.get('INPUT_FILE')
@@ -12,6 +19,26 @@ OUTPUT_FOLDER = config.get('OUTPUT_FOLDER')
 VOICE = config.get('VOICE')
 SILENCE_BEFORE_MS = config.get('SILENCE_BEFORE_MS')
 SILENCE_AFTER_MS = config.get('SILENCE_AFTER_MS')
+TTS_WORKERS = config.get('TTS_WORKERS', 4)
+TTS_MAX_RETRIES = config.get('TTS_MAX_RETRIES', 4)
+TTS_RETRY_BACKOFF_S = config.get('TTS_RETRY_BACKOFF_S', 1.0)
+
+# edge-tts streams audio-24khz-48kbitrate-mono-mp3; padding is encoded to match
+TTS_SAMPLE_RATE = 24000
+TTS_BITRATE = "48k"
+
+# Records the content hash of every slide_NNN.mp3 in OUTPUT_FOLDER
+MANIFEST_FILE = "manifest.json"
+SLIDE_FILE_PATTERN = re.compile(r'^slide_(\d+)(\.mp3|_failed\.txt)$')
+
+class EmptyAudioError(Exception):
+    """TTS returned no audio or a truncated file"""
+
+# Throttling and dropped connections surface as these; anything else is permanent
+TRANSIENT_ERRORS = (
+    aiohttp.ClientError, asyncio.TimeoutError, ConnectionError, EmptyAudioError,
+    edge_tts.exceptions.NoAudioReceived, edge_tts.exceptions.WebSocketError
+)
 
 def sanitize_text(text):
     replacements = {
@@ -24,132 +51,248 @@ def sanitize_text(text):
     text = re.sub(r'\s+', ' ', text)
     return text.strip()
 
-async def generate_audio(title, text, output_path):
+class TTSScheduler:
+    """Run slide TTS jobs on a fixed number of workers with a shared backoff.
+    
+    When a request fails with a transient error, every worker holds off
+    until the backoff expires before starting its next request, so a
+    throttled service gets room to recover instead of a burst of retries.
+    """
+    
+    def __init__(self, workers=TTS_WORKERS, max_retries=TTS_MAX_RETRIES, backoff=TTS_RETRY_BACKOFF_S):
+        self.workers = max(1, workers)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.resume_at = 0.0
+        self.retries = 0
+        self.completed = 0
+        self.results = {'ok': 0, 'unchanged': 0, 'skipped': 0, 'failed': 0}
+        self.statuses = {}
+        self.elapsed = 0.0
+    
+    async def call(self, label, request):
+        """Await request(), retrying transient failures with exponential backoff"""
+        for attempt in range(self.max_retries + 1):
+            delay = self.resume_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                return await request()
+            except TRANSIENT_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                wait = self.backoff * 2 ** attempt * random.uniform(1, 1.5)
+                self.resume_at = max(self.resume_at, time.monotonic() + wait)
+                self.retries += 1
+                print(f"  🔁 Retry {attempt + 1}/{self.max_retries} for {label} in {wait:.1f}s: {e!r}")
+    
+    async def run(self, jobs, padding):
+        """Generate audio for (title, notes, output_path) jobs"""
+        queue = asyncio.Queue()
+        for job in jobs:
+            queue.put_nowait(job)
+        total = queue.qsize()
+        
+        async def worker():
+            while True:
+                try:
+                    title, notes, output_path = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                status = await generate_audio(title, notes, output_path, self, padding)
+                self.statuses[output_path] = status
+                self.results[status] += 1
+                self.completed += 1
+                if self.completed % 10 == 0 or self.completed == total:
+                    print(f"  📊 Progress: {self.completed}/{total} slides")
+        
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, total))))
+        self.elapsed = time.perf_counter() - started
+    
+    def print_summary(self):
+        print("\n📋 Summary:")
+        print(f"   Generated: {self.results['ok']}")
+        print(f"   Unchanged: {self.results['unchanged']}")
+        print(f"   Skipped:   {self.results['skipped']}")
+        print(f"   Failed:    {self.results['failed']}")
+        print(f"   Retries:   {self.retries}")
+        print(f"   Time:      {self.elapsed:.1f}s with {self.workers} workers")
+
+async def fetch_tts(text):
+    """Stream one slide's speech from edge-tts into memory"""
+    audio = bytearray()
+    communicate = edge_tts.Communicate(text=text, voice=VOICE)
+    async for chunk in communicate.stream():
+        if chunk['type'] == 'audio':
+            audio.extend(chunk['data'])
+    
+    if len(audio) < 100:
+        raise EmptyAudioError("No audio received or audio is too short (possible TTS service failure or invalid characters).")
+    return bytes(audio)
+
+def encode_silence(duration_ms):
+    """MP3 frames of silence in the format edge-tts streams.
+    
+    MP3 frames are independent, so these can be joined to the TTS audio
+    as bytes and the speech is never decoded or re-encoded.
+    """
+    if duration_ms <= 0:
+        return b''
+    silence = AudioSegment.silent(duration=duration_ms, frame_rate=TTS_SAMPLE_RATE)
+    buffer = io.BytesIO()
+    # No ID3 tag or Xing header: players would read either as describing the whole joined file
+    silence.export(buffer, format="mp3", bitrate=TTS_BITRATE,
+                   parameters=['-write_xing', '0', '-id3v2_version', '0'])
+    return buffer.getvalue()
+
+def slide_hash(clean_text):
+    """Hash of everything that determines a slide's audio"""
+    key = [clean_text, VOICE, SILENCE_BEFORE_MS, SILENCE_AFTER_MS, TTS_SAMPLE_RATE, TTS_BITRATE]
+    return hashlib.sha256(json.dumps(key).encode('utf-8')).hexdigest()
+
+def slide_path(idx):
+    return os.path.join(OUTPUT_FOLDER, f"slide_{idx:03d}.mp3")
+
+def load_manifest():
+    """Slide index -> hash of the audio currently in OUTPUT_FOLDER"""
+    path = os.path.join(OUTPUT_FOLDER, MANIFEST_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('slides', {})
+    except (OSError, ValueError) as e:
+        if os.path.exists(path):
+            print(f"  ⚠️ Ignoring unreadable manifest ({e}); regenerating all slides")
+        return {}
+
+def save_manifest(slides):
+    path = os.path.join(OUTPUT_FOLDER, MANIFEST_FILE)
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'slides': slides}, f, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
+
+def prune_outputs(keep):
+    """Delete slide MP3s and failure notes that are not in keep"""
+    removed = 0
+    for name in os.listdir(OUTPUT_FOLDER):
+        if SLIDE_FILE_PATTERN.match(name) and name not in keep:
+            os.remove(os.path.join(OUTPUT_FOLDER, name))
+            removed += 1
+    return removed
+
+def save_failure(title, error, output_path, original_text, clean_text):
+    print(f"  ❌ FAILED for {os.path.basename(output_path)} ({title}): {error}")
+    print(f"     Text that caused failure (Original):\n---\n{repr(original_text)}\n---")
+    
+    fail_filepath = output_path.replace('.mp3', '_failed.txt')
+    try:
+        with open(fail_filepath, 'w', encoding='utf-8') as f:
+            f.write(f"Slide: {title}\n")
+            f.write(f"Error: {error}\n\n")
+            f.write("Original Text:\n")
+            f.write(original_text)
+            f.write("\n\nSanitized Text:\n")
+            f.write(clean_text)
+        print(f"     Problematic text saved to: {os.path.basename(fail_filepath)}")
+    except Exception as file_e:
+        print(f"     Could not save problematic text to file: {file_e}")
+
+async def generate_audio(title, text, output_path, scheduler, padding):
+    """Generate one slide's MP3 and return 'ok', 'skipped' or 'failed'.
+    
+    padding holds the (before, after) silence frames from encode_silence.
+    """
     if not text.strip():
         print(f"  ⚠️ Skipping empty slide for {os.path.basename(output_path)} ({title})")
-        return
+        return 'skipped'
     
-    original_text = text
     clean_text = sanitize_text(text)
     
     if not clean_text:
         print(f"  ⚠️ Text became empty after sanitization for {os.path.basename(output_path)} ({title})")
-        return
-
-    silence_before = AudioSegment.silent(duration=SILENCE_BEFORE_MS)
-    silence_after = AudioSegment.silent(duration=SILENCE_AFTER_MS)
-    temp_path = output_path + ".temp.mp3"
+        return 'skipped'
     
     try:
-        communicate = edge_tts.Communicate(text=clean_text, voice=VOICE)
-        await communicate.save(temp_path)
-        
-        if not os.path.exists(temp_path) or os.path.getsize(temp_path) < 100:
-            raise Exception("No audio received or file is too small (possible TTS service failure or invalid characters).")
-        
-        tts_audio = AudioSegment.from_file(temp_path)
-        final_audio = silence_before + tts_audio + silence_after
-        final_audio.export(output_path, format="mp3")
+        speech = await scheduler.call(os.path.basename(output_path), lambda: fetch_tts(clean_text))
+        silence_before, silence_after = padding
+        with open(output_path, 'wb') as f:
+            f.write(silence_before)
+            f.write(speech)
+            f.write(silence_after)
         print(f"  ✅ {os.path.basename(output_path)}")
-        
+        return 'ok'
     except Exception as e:
-        print(f"  ❌ FAILED for {os.path.basename(output_path)} ({title}): {e}")
-        print(f"     Text that caused failure (Original):\n---\n{repr(original_text)}\n---")
-        
-        fail_filepath = output_path.replace('.mp3', '_failed.txt')
-        try:
-            with open(fail_filepath, 'w', encoding='utf-8') as f:
-                f.write(f"Slide: {title}\n")
-                f.write(f"Error: {e}\n\n")
-                f.write("Original Text:\n")
-                f.write(original_text)
-                f.write("\n\nSanitized Text:\n")
-                f.write(clean_text)
-            print(f"     Problematic text saved to: {os.path.basename(fail_filepath)}")
-        except Exception as file_e:
-            print(f"     Could not save problematic text to file: {file_e}")
-            
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-
-def parse_slides(content):
-    if content.startswith('\ufeff'):
-        content = content[1:]
-    
-    slides = []
-    lines = content.splitlines()
-    
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        
-        slide_match = re.match(r'^##\s+Slide\s+(\d+):\s*(.*)', line, re.IGNORECASE)
-        
-        if slide_match:
-            slide_num = slide_match.group(1)
-            title = slide_match.group(2)
-            full_title = f"Slide {slide_num}: {title}"
-            
-            i += 1
-            
-            notes_lines = []
-            
-            while i < len(lines):
-                current_line = lines[i].strip()
-                
-                if re.match(r'^##\s+Slide\s+\d+:', current_line):
-                    break
-                
-                if not notes_lines and not current_line:
-                    i += 1
-                    continue
-                
-                if current_line:
-                    notes_lines.append(current_line)
-                
-                i += 1
-            
-            notes = ' '.join(notes_lines)
-            notes = re.sub(r'\s+', ' ', notes).strip()
-            
-            slides.append((full_title, notes))
-        else:
-            i += 1
-    
-    return slides
+        save_failure(title, e, output_path, text, clean_text)
+        return 'failed'
 
 async def main():
     os.makedirs(OUTPUT_FOLDER, exist_ok=True)
     if not os.path.isfile(INPUT_FILE):
         print(f"❌ ERROR: File not found: {INPUT_FILE}")
         return
+
+    print("🔍 Parsing slides from Markdown file...")
     try:
-        with open(INPUT_FILE, 'r', encoding='utf-8-sig') as f:
-            content = f.read()
+        slides = list(read_slides(INPUT_FILE))
     except Exception as e:
         print(f"❌ ERROR reading file: {e}")
         return
 
-    print("🔍 Parsing slides from Markdown file...")
-    slides = parse_slides(content)
-
     if not slides:
         print("❌ ERROR: No slides found!")
         print("\n💡 First 500 chars:")
-        print(repr(content[:500]))
+        with open(INPUT_FILE, 'r', encoding='utf-8-sig') as f:
+            print(repr(f.read(500)))
         return
 
     print(f"✅ Parsed {len(slides)} slides.")
-    tasks = []
-    for idx, (title, notes) in enumerate(slides, 1):
-        output_file = os.path.join(OUTPUT_FOLDER, f"slide_{idx:03d}.mp3")
-        tasks.append(generate_audio(title, notes, output_file))
+    scheduler = TTSScheduler()
+    manifest = load_manifest()
+    hashes = {}
+    unchanged = {}
+    jobs = []
+    for idx, slide in enumerate(slides, 1):
+        title, notes = slide.full_title, slide.notes
+        output_file = slide_path(idx)
+        clean_text = sanitize_text(notes)
+        if clean_text:
+            hashes[str(idx)] = slide_hash(clean_text)
+            if manifest.get(str(idx)) == hashes[str(idx)] and os.path.exists(output_file):
+                scheduler.results['unchanged'] += 1
+                unchanged[str(idx)] = hashes[str(idx)]
+                continue
+        jobs.append((title, notes, output_file))
         print(f"  📝 {title}")
         print(f"     Notes: {notes[:100]}{'...' if len(notes) > 100 else ''}")
 
-    print("\n🔊 Generating audio...")
-    await asyncio.gather(*tasks)
+    if scheduler.results['unchanged']:
+        print(f"\n♻️ {scheduler.results['unchanged']} slides unchanged since the last run")
+    if jobs:
+        # Forget the slides about to be overwritten first: if the run is
+        # interrupted, a half-updated file must not pass as unchanged later
+        save_manifest(unchanged)
+        padding = (encode_silence(SILENCE_BEFORE_MS), encode_silence(SILENCE_AFTER_MS))
+        print(f"\n🔊 Generating audio for {len(jobs)} slides with {scheduler.workers} workers...")
+        await scheduler.run(jobs, padding)
+
+    # Failed slides stay out of the manifest so the next run retries them
+    current = {}
+    keep = set()
+    for key, digest in hashes.items():
+        output_file = slide_path(int(key))
+        status = scheduler.statuses.get(output_file, 'unchanged')
+        if status in ('ok', 'unchanged'):
+            current[key] = digest
+        elif status == 'failed':
+            keep.add(os.path.basename(output_file).replace('.mp3', '_failed.txt'))
+        keep.add(os.path.basename(output_file))
+    save_manifest(current)
+
+    removed = prune_outputs(keep)
+    if removed:
+        print(f"  🧹 Removed {removed} orphaned files")
+    scheduler.print_summary()
 
     mp3_count = len([f for f in os.listdir(OUTPUT_FOLDER) if f.endswith('.mp3')])
     print(f"\n🎉 Done! Generated {mp3_count} files in '{OUTPUT_FOLDER}'")
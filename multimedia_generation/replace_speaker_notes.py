@@ -1,7 +1,7 @@
 # replace_speaker_notes.py
 from pptx import Presentation
-import re
 from config_loader import config
+from slide_parser import read_slides
 
 def parse_speaker_notes():
     """
@@ -9,26 +9,8 @@ def parse_speaker_notes():
     Returns a dictionary with slide number as key and notes text as value.
     """
     md_file_path = config.get('INPUT_FILE')
-    notes_dict = {}
-    current_slide = None
-    current_notes = []
-    
-    with open(md_file_path, 'r', encoding='utf-8') as file:
-        for line in file:
-            line = line.strip()
-            match = re.match(r'##\s*Slide\s*(\d+):', line)
-            if match:
-                if current_slide is not None and current_notes:
-                    notes_dict[current_slide] = '\n'.join(current_notes).strip()
-                current_slide = int(match.group(1))
-                current_notes = []
-            elif current_slide is not None:
-                current_notes.append(line)
-    
-    if current_slide is not None and current_notes:
-        notes_dict[current_slide] = '\n'.join(current_notes).strip()
-    
-    return notes_dict
+    # Slides without notes are left out so their existing notes are kept
+    return {slide.number: slide.notes_text for slide in read_slides(md_file_path) if slide.lines}
 
 def replace_speaker_notes():
     """
@@ -0,0 +1,65 @@
+# slide_parser.py
+import re
+from typing import Iterable, Iterator, NamedTuple, Tuple
+
+# "## Slide 12: Title", tolerant of missing spaces and heading case
+SLIDE_HEADING = re.compile(r'##\s*Slide\s*(\d+)\s*:\s*(.*)', re.IGNORECASE)
+WHITESPACE = re.compile(r'\s+')
+
+class Slide(NamedTuple):
+    """One slide section of the speaker notes Markdown file"""
+    number: int
+    title: str
+    # Stripped note lines with leading and trailing blank lines removed
+    lines: Tuple[str, ...]
+
+    @property
+    def full_title(self) -> str:
+        return f"Slide {self.number}: {self.title}"
+
+    @property
+    def notes(self) -> str:
+        """Notes as one line of single-spaced text, as read aloud"""
+        return WHITESPACE.sub(' ', ' '.join(line for line in self.lines if line))
+
+    @property
+    def notes_text(self) -> str:
+        """Notes with their line breaks, as shown in PowerPoint"""
+        return '\n'.join(self.lines)
+
+def iter_slides(lines: Iterable[str]) -> Iterator[Slide]:
+    """Yield a Slide for every "## Slide N: Title" heading in lines.
+
+    Lines before the first heading are ignored. Only one slide's notes are
+    held at a time, so lines can be a file object of any size.
+    """
+    number = None
+    title = ''
+    notes = []
+
+    for line in lines:
+        line = line.strip()
+        # Cheap prefix test first: most lines are notes, not headings
+        match = SLIDE_HEADING.match(line) if line.startswith('##') else None
+        if match:
+            if number is not None:
+                yield make_slide(number, title, notes)
+            number = int(match.group(1))
+            title = match.group(2).strip()
+            notes = []
+        elif number is not None and (line or notes):
+            notes.append(line)
+
+    if number is not None:
+        yield make_slide(number, title, notes)
+
+def make_slide(number: int, title: str, notes: list) -> Slide:
+    while notes and not notes[-1]:
+        notes.pop()
+    return Slide(number, title, tuple(notes))
+
+def read_slides(path: str) -> Iterator[Slide]:
+    """Lazily parse the slides of a Markdown file, one line at a time"""
+    # utf-8-sig drops a BOM that would otherwise hide the first heading
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        yield from iter_slides(f)